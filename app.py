@@ -9,6 +9,10 @@ from inventory_management_system.data_model.dynamodb_data_model import (
 from inventory_management_system.frontend_stack import FrontendStack
 
 app = cdk.App()
+# Opt in with `cdk deploy -c provisioned_concurrency=true`
+provisioned_concurrency = (
+    str(app.node.try_get_context("provisioned_concurrency")).lower() == "true"
+)
 dynamo_db_stack = DynamoDbStack(
     app,
     "DynamoDbStack",
@@ -25,6 +29,7 @@ ApiLambdaStack(
         account=os.getenv("CDK_DEFAULT_ACCOUNT"), region=os.getenv("CDK_DEFAULT_REGION")
     ),
     dynamodb_table=dynamo_db_stack.inventory_table,
+    provisioned_concurrency=provisioned_concurrency,
 )
 
 FrontendStack(
@@ -1,7 +1,13 @@
+import json
 from aws_cdk import (
+    CfnOutput,
+    Duration,
+    Fn,
     Stack,
     aws_lambda as _lambda,
     aws_apigatewayv2 as api_gatewayv2,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
     aws_dynamodb as dynamodb,
 )
 from aws_cdk.aws_apigatewayv2_integrations import HttpLambdaIntegration
@@ -19,18 +25,46 @@ class ApiLambdaStack(Stack):
         construct_id: str,
         *,
         dynamodb_table: dynamodb.TableV2,
+        provisioned_concurrency: bool = False,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
+        self.provisioned_concurrency = provisioned_concurrency
+        # Shared helpers (boto3 config, GSI readiness check, responses), attached to every function
+        self.common_layer = _lambda.LayerVersion(
+            self,
+            "CommonLayer",
+            code=_lambda.Code.from_asset(
+                "layers/common",
+                # Only the importable modules are shipped, boto3 and botocore come from the runtime
+                exclude=[
+                    "requirements.txt",
+                    "**/__pycache__",
+                    "*.pyc",
+                    "**/*.dist-info",
+                    "**/tests",
+                ],
+            ),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            description="Helpers shared by the inventory Lambda functions",
+        )
         lambdas = self.create_lambda_functions(dynamodb_table=dynamodb_table)
-        self.create_api_gw(lambdas=lambdas)
+        inventory_api = self.create_api_gw(lambdas=lambdas)
+        distribution = self.create_api_cache_distribution(api=inventory_api)
+        # Base URL of the cached API, clients use it instead of the execute-api endpoint
+        CfnOutput(
+            self,
+            "InventoryApiCacheDomainName",
+            value=distribution.distribution_domain_name,
+            description="CloudFront domain serving the API, with /inventories/aggregate cached",
+        )
 
     def add_route(
         self,
         api: api_gatewayv2.HttpApi,
         path: str,
         methods: list[api_gatewayv2.HttpMethod],
-        lambda_function: _lambda.Function,
+        lambda_function: _lambda.IFunction,
         integration_id: str,
     ) -> None:
         """Helper function to add a route to the API Gateway."""
@@ -50,16 +84,28 @@ class ApiLambdaStack(Stack):
         dynamodb_table: dynamodb.TableV2,
         environment_vars: dict = None,
         read_write_access: bool = False,
-    ) -> _lambda.Function:
-        """Helper function to create a Lambda function"""
+        provisioned: bool = False,
+    ) -> _lambda.IFunction:
+        """Helper function to create a Lambda function
+
+        If `provisioned` is True, a "live" alias with one provisioned concurrent execution
+        is created and returned instead of the function, so that requests are served by a
+        pre-initialized execution environment without cold start.
+        """
+        # Each function's asset only contains its own handler module, so changing one
+        # handler only changes (and re-uploads) that function's asset
+        handler_module = handler.split(".")[0]
         fn = _lambda.Function(
             self,
             id,
             function_name=function_name,
             runtime=_lambda.Runtime.PYTHON_3_12,
-            code=_lambda.Code.from_asset("lambdas"),
+            code=_lambda.Code.from_asset(
+                "lambdas", exclude=["*", f"!{handler_module}.py"]
+            ),
             handler=handler,
             environment=environment_vars,
+            layers=[self.common_layer],
         )
 
         if read_write_access:
@@ -67,13 +113,26 @@ class ApiLambdaStack(Stack):
         else:
             dynamodb_table.grant_read_data(fn)
 
+        if provisioned:
+            return _lambda.Alias(
+                self,
+                f"{id}Alias",
+                alias_name="live",
+                version=fn.current_version,
+                provisioned_concurrent_executions=1,
+            )
+
         return fn
 
     def create_lambda_functions(
         self,
         dynamodb_table: dynamodb.TableV2,
-    ) -> dict[str, _lambda.Function]:
-        """Create needed lambda functions for backend tasks"""
+    ) -> dict[str, _lambda.IFunction]:
+        """Create needed lambda functions for backend tasks
+
+        Provisioned concurrency, when enabled for the stack, is only used by the latency sensitive read functions
+        and the upsert function.
+        """
         return {
             # Backend Task 1
             "upsert_inventory_fn": self.create_lambda_function_with_dynamodb_access(
@@ -83,6 +142,7 @@ class ApiLambdaStack(Stack):
                 dynamodb_table=dynamodb_table,
                 environment_vars={"DB_TABLE_NAME": dynamodb_table.table_name},
                 read_write_access=True,
+                provisioned=self.provisioned_concurrency,
             ),
             # Backend Task 2
             "filter_inventory_by_date_range_fn": self.create_lambda_function_with_dynamodb_access(
@@ -91,6 +151,7 @@ class ApiLambdaStack(Stack):
                 handler="filterInventoryByDateRangeFunction.handler",
                 dynamodb_table=dynamodb_table,
                 environment_vars={"DB_TABLE_NAME": dynamodb_table.table_name},
+                provisioned=self.provisioned_concurrency,
             ),
             # Backend Task 3
             "aggregate_inventory_fn": self.create_lambda_function_with_dynamodb_access(
@@ -100,8 +161,9 @@ class ApiLambdaStack(Stack):
                 dynamodb_table=dynamodb_table,
                 environment_vars={
                     "DB_TABLE_NAME": dynamodb_table.table_name,
-                    "CATEGORIES": str(CategoryEnum.list()),
+                    "CATEGORIES": json.dumps(CategoryEnum.list()),
                 },
+                provisioned=self.provisioned_concurrency,
             ),
             # Backend Task 4
             "query_inventory_fn": self.create_lambda_function_with_dynamodb_access(
@@ -112,6 +174,7 @@ class ApiLambdaStack(Stack):
                 environment_vars={
                     "DB_TABLE_NAME": dynamodb_table.table_name,
                 },
+                provisioned=self.provisioned_concurrency,
             ),
             # Extra: Function to delete inventory item
             "delete_inventory_fn": self.create_lambda_function_with_dynamodb_access(
@@ -126,7 +189,7 @@ class ApiLambdaStack(Stack):
             ),
         }
 
-    def create_api_gw(self, lambdas: list) -> None:
+    def create_api_gw(self, lambdas: list) -> api_gatewayv2.HttpApi:
         """Create api routes"""
         inventory_api = api_gatewayv2.HttpApi(
             self,
@@ -144,47 +207,106 @@ class ApiLambdaStack(Stack):
             ),
         )
 
-        # Route for Backend Task 1: Upsert item
-        self.add_route(
-            api=inventory_api,
-            path="/inventory",
-            methods=[api_gatewayv2.HttpMethod.POST],
-            lambda_function=lambdas["upsert_inventory_fn"],
-            integration_id="upsertInventoryFunction",
-        )
+        # (path, method, lambda function key, integration id)
+        routes = [
+            # Route for Backend Task 1: Upsert item
+            (
+                "/inventory",
+                api_gatewayv2.HttpMethod.POST,
+                "upsert_inventory_fn",
+                "upsertInventoryFunction",
+            ),
+            # Route for Backend Task 2: Filter item by date range
+            (
+                "/inventories/filterByDateRange",
+                api_gatewayv2.HttpMethod.GET,
+                "filter_inventory_by_date_range_fn",
+                "filterInventoryByDateRangeFunction",
+            ),
+            # Route for Backend Task 3: Aggregate item by category
+            (
+                "/inventories/aggregate",
+                api_gatewayv2.HttpMethod.GET,
+                "aggregate_inventory_fn",
+                "AggregateInventoryFunction",
+            ),
+            # Route for Backend Task 4: Handle Filters, Pagination and Sorting Options
+            (
+                "/inventories",
+                api_gatewayv2.HttpMethod.POST,
+                "query_inventory_fn",
+                "QueryInventoryFunction",
+            ),
+            # Route for Item Deletion: Handle Deletion of Item
+            (
+                "/inventory/delete",
+                api_gatewayv2.HttpMethod.POST,
+                "delete_inventory_fn",
+                "DeleteInventoryFunction",
+            ),
+        ]
+        for path, method, lambda_key, integration_id in routes:
+            self.add_route(
+                api=inventory_api,
+                path=path,
+                methods=[method],
+                lambda_function=lambdas[lambda_key],
+                integration_id=integration_id,
+            )
 
-        # Route for Backend Task 2: Filter item by date range
-        self.add_route(
-            api=inventory_api,
-            path="/inventories/filterByDateRange",
-            methods=[api_gatewayv2.HttpMethod.GET],
-            lambda_function=lambdas["filter_inventory_by_date_range_fn"],
-            integration_id="filterInventoryByDateRangeFunction",
-        )
+        return inventory_api
+
+    def create_api_cache_distribution(
+        self, api: api_gatewayv2.HttpApi
+    ) -> cloudfront.Distribution:
+        """Create a CloudFront distribution in front of the API
 
-        # Route for Backend Task 3: Aggregate item by category
-        self.add_route(
-            api=inventory_api,
-            path="/inventories/aggregate",
-            methods=[api_gatewayv2.HttpMethod.GET],
-            lambda_function=lambdas["aggregate_inventory_fn"],
-            integration_id="AggregateInventoryFunction",
+        Requests are passed through to the API uncached, except the aggregate route whose
+        responses are cached per `category` query parameter for the max-age sent by the function
+        (at most 30 seconds), with CORS headers added by CloudFront. The aggregate
+        result only changes when an item is upserted or deleted, so repeated requests
+        are served from the edge without invoking Lambda or reading DynamoDB.
+
+        Args:
+            api (api_gatewayv2.HttpApi): The API to put behind the distribution
+
+        Returns:
+            cloudfront.Distribution: created CloudFront distribution
+        """
+        # api_endpoint is "https://<api id>.execute-api.<region>.amazonaws.com"
+        api_origin = origins.HttpOrigin(
+            Fn.select(2, Fn.split("/", api.api_endpoint)),
+            protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY,
         )
 
-        # Route for Backend Task 4: Handle Filters, Pagination and Sorting Options
-        self.add_route(
-            api=inventory_api,
-            path="/inventories",
-            methods=[api_gatewayv2.HttpMethod.POST],
-            lambda_function=lambdas["query_inventory_fn"],
-            integration_id="QueryInventoryFunction",
+        aggregate_cache_policy = cloudfront.CachePolicy(
+            self,
+            "AggregateInventoryCachePolicy",
+            # The Cache-Control max-age of the function decides the TTL, 30 seconds when it is missing
+            min_ttl=Duration.seconds(0),
+            default_ttl=Duration.seconds(30),
+            max_ttl=Duration.seconds(60),
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.allow_list(
+                "category"
+            ),
         )
 
-        # Route for Item Deletion: Handle Deletion of Item
-        self.add_route(
-            api=inventory_api,
-            path="/inventory/delete",
-            methods=[api_gatewayv2.HttpMethod.POST],
-            lambda_function=lambdas["delete_inventory_fn"],
-            integration_id="DeleteInventoryFunction",
+        return cloudfront.Distribution(
+            self,
+            "InventoryApiDistribution",
+            default_behavior=cloudfront.BehaviorOptions(
+                origin=api_origin,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                cache_policy=cloudfront.CachePolicy.CACHING_DISABLED,
+                origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+            ),
+            additional_behaviors={
+                "/inventories/aggregate*": cloudfront.BehaviorOptions(
+                    origin=api_origin,
+                    allowed_methods=cloudfront.AllowedMethods.ALLOW_GET_HEAD,
+                    cache_policy=aggregate_cache_policy,
+                    # The Origin header is not forwarded, so API Gateway does not add the CORS headers of this route
+                    response_headers_policy=cloudfront.ResponseHeadersPolicy.CORS_ALLOW_ALL_ORIGINS,
+                ),
+            },
         )
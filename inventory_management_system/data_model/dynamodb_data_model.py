@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import cache
 from aws_cdk import aws_dynamodb as dynamodb
 
 
@@ -32,13 +33,15 @@ class ExtendedEnum(Enum):
     """Entension of standard Enum to provide list functionality
 
     Methods:
-        list(enum_class: list[Enum]): Returns a list of values from the Enum items
+        list(enum_class: list[Enum]): Returns a tuple of values from the Enum items.
+            The result is cached per Enum class, it is immutable so it is safe to share.
 
     """
 
     @classmethod
-    def list(enum_class: list[Enum]):
-        return [category.value for category in enum_class]
+    @cache
+    def list(enum_class: list[Enum]) -> tuple:
+        return tuple(category.value for category in enum_class)
 
 
 class CategoryEnum(ExtendedEnum):
@@ -12,6 +12,11 @@ from faker import Faker
 import faker_commerce
 from .data_model.dynamodb_data_model import CategoryEnum, DynamoDbTableModel
 
+# Faker loads locale data and scans its providers on construction, so a single instance is shared
+_faker = Faker()
+_faker.add_provider(faker_commerce.Provider)
+_CATEGORIES = CategoryEnum.list()
+
 
 class DynamoDbStack(Stack):
 
@@ -21,7 +26,7 @@ class DynamoDbStack(Stack):
         construct_id: str,
         *,
         dynamodb_data_model: DynamoDbTableModel,
-        **kwargs
+        **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
         self.table_model = dynamodb_data_model
@@ -79,22 +84,21 @@ class DynamoDbStack(Stack):
         Returns:
             dict: A dictionary representing a fake data item
         """
-        faker = Faker()
-        faker.add_provider(faker_commerce.Provider)
         return {
             "id": {"S": str(uuid.uuid4())},
-            "name": {"S": faker.ecommerce_name()},
-            "category": {"S": random.choice(CategoryEnum.list())},
+            "name": {"S": _faker.ecommerce_name()},
+            "category": {"S": random.choice(_CATEGORIES)},
             "price": {"N": str(round(random.uniform(1, 100), 1))},
-            "last_updated_dt": {"S": faker.date_time().isoformat()},
+            "last_updated_dt": {"S": _faker.date_time().isoformat()},
             "static_pk": {"S": "PRODUCT"},
         }
 
-    def generate_batch_fake_data(self, batch_size: int = 20) -> list:
+    def generate_batch_fake_data(self, batch_size: int = 25) -> list:
         """Generate a batch of fake data items.
 
         Args:
-            batch_size (int, optional): The number of fake items to generate. Defaults to 20.
+            batch_size (int, optional): The number of fake items to generate.
+                Defaults to 25, the maximum number of items in a BatchWriteItem request.
 
         Returns:
             list: A list of dictionaries that represent the fake items
@@ -104,20 +108,36 @@ class DynamoDbStack(Stack):
             for _ in range(batch_size)
         ]
 
-    def populate_table(self, table: dynamodb.TableV2):
+    def populate_table(self, table: dynamodb.TableV2, num_batches: int = 1):
         """Initialize table data.
 
+        Each batch is written by its own custom resource. The custom resources do not depend
+        on each other, so CloudFormation creates them in parallel.
+
+        Args:
+            table (dynamodb.TableV2): dynamodb table to populate
+            num_batches (int, optional): The number of batches of fake items to write. Defaults to 1.
+        """
+        for i in range(num_batches):
+            self.create_batch_write_resource(table=table, batch_id=i)
+
+    def create_batch_write_resource(self, table: dynamodb.TableV2, batch_id: int):
+        """Create a custom resource that writes a batch of fake items on stack creation.
+
         Args:
             table (dynamodb.TableV2): dynamodb table to populate
+            batch_id (int): The index of the batch, used to name the custom resource
         """
+        # The first batch keeps the original IDs, so deployed stacks do not recreate it and write it again
+        suffix = str(batch_id) if batch_id else ""
         custom_resources.AwsCustomResource(
             self,
-            "initializeTableResource",
+            f"initializeTableResource{suffix}",
             on_create=custom_resources.AwsSdkCall(
                 action="batchWriteItem",
                 service="DynamoDB",
                 physical_resource_id=custom_resources.PhysicalResourceId.of(
-                    table.table_name + "_initializeTableData"
+                    f"{table.table_name}_initializeTableData{suffix}"
                 ),
                 parameters={
                     "RequestItems": {
@@ -1,123 +1,261 @@
 import os
-import boto3
-from boto3.dynamodb.conditions import Key
 import logging
 import json
 import time
+from collections import defaultdict
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
+from common import (
+    ensure_index_ready,
+    get_ddb_client,
+    get_wait_timeout,
+    json_response,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
+# Low-level client, only the price attribute is read so the resource layer's deserialization is skipped.
+dynamodb_client = get_ddb_client()
+# Initialized once per Lambda container and reused by warm invocations
+TABLE_NAME = os.environ["DB_TABLE_NAME"]
 
 
-def wait_for_index_active(table, index_name: str):
-    """Waits until the specified global secondary index(GSI) to become ACTIVE.
+def get_canonical_categories() -> list[str]:
+    """Retrieves the list of pre-defined categories.
 
-    This function continuously checks the status of the specific GSI
-    of a DynamoDB table until it becomes active. It logs a message every 5 seconds
-    indicating that it's waiting for the index to backfill.
+    This function parses the `CATEGORIES` environment variable, a JSON array of the categories
+    as they are stored in DynamoDB (eg: Clothing).
 
-    Args:
-        table: The DynamoDB table object.
-        index_name: The name of the GSI to wait for.
+    Returns:
+        A list of categories.
 
     Raises:
-        RuntimeError: If the index does not become active within a reasonable time.
+        ValueError: If the `CATEGORIES` environment variable is not set or cannot be parsed.
     """
-
-    def is_index_active(indexes, index_name):
-        for index in indexes:
-            if index["IndexName"] == index_name:
-                return index["IndexStatus"] == "ACTIVE"
-        return False
-
-    while True:
-        if not table.global_secondary_indexes or not is_index_active(
-            indexes=table.global_secondary_indexes, index_name=index_name
-        ):
-            print("Waiting for index to backfill...")
-            time.sleep(5)
-            table.reload()
-        else:
-            break
+    return json.loads(os.environ.get("CATEGORIES"))
 
 
-def get_valid_categories() -> list[str]:
-    """Retrieves and validates the list of valid categories.
+def get_category_lookup() -> dict[str, str]:
+    """Retrieves the mapping of accepted category inputs to the pre-defined categories.
 
-    This function returns all accepted categories. It retrieves `CATEGORIES` environment variable containing a list of
-    pre-defined categories. It also handle case-insensitive matching (eg: Clothing and clothing will be accepted).
+    Category inputs are matched case-insensitively (eg: Clothing, clothing and CLOTHING are all accepted),
+    so the lowercased input is looked up and mapped to the category as it is stored in DynamoDB.
 
     Returns:
-        A list of valid categories.
+        A dictionary of lowercased category to pre-defined category.
 
     Raises:
-        ValueError: If the `CATEGORIES` environment variable is not set or cannot be evaluated.
+        ValueError: If the `CATEGORIES` environment variable is not set or cannot be parsed.
     """
-    categories_str = os.environ.get("CATEGORIES")
-    first_letter_uppercase_categories = eval(categories_str)
-    first_letter_lowercase_categories = [
-        category.lower() for category in first_letter_uppercase_categories
-    ]
-    return (
-        first_letter_uppercase_categories
-        + first_letter_lowercase_categories
-        + ["All", "ALL", "AlL", "ALl", "alL", "aLl", "all"]
-    )
-
-
-def get_inventory_of_category(table, category: str, target_index_name: str):
+    return {category.lower(): category for category in get_canonical_categories()}
+
+
+# CATEGORIES is parsed once at cold start. Accepted (lowercased) category inputs are kept in a set
+# for constant time lookups, together with the "all" keyword
+CATEGORIES = tuple(get_canonical_categories())
+CATEGORY_LOOKUP = get_category_lookup()
+VALID_CATEGORIES = frozenset(CATEGORY_LOOKUP) | {"all"}
+
+# Per-container cache of category aggregates: category -> (time cached, aggregate).
+# Responses are cached by CloudFront only for the remaining TTL of the entries they were built from,
+# so the total staleness stays within CACHE_TTL_SECONDS
+CACHE_TTL_SECONDS = 30.0
+_CACHE: dict[str, tuple[float, dict]] = {}
+
+
+# Static part of the category query, only the category value changes between calls.
+# Only the price is needed to aggregate, so avoid transferring the rest of the item
+CATEGORY_QUERY_TEMPLATE = {
+    "KeyConditionExpression": "#category = :category",
+    "ExpressionAttributeNames": {"#category": "category"},
+    "ProjectionExpression": "price",
+    "Select": "SPECIFIC_ATTRIBUTES",
+}
+
+# The all categories aggregate is read with a single parallel scan of the index instead of one query per category.
+# The index only holds the items that have a category and a price, and only those two attributes are transferred
+ALL_CATEGORIES_SCAN_TEMPLATE = {
+    "ProjectionExpression": "category, price",
+    "Select": "SPECIFIC_ATTRIBUTES",
+}
+SCAN_SEGMENTS = 4
+# One thread per scan segment, created once and reused by warm invocations.
+# Kept below the client's connection pool size so threads never wait for a connection
+_POOL = ThreadPoolExecutor(max_workers=SCAN_SEGMENTS)
+
+
+def get_inventory_of_category(table_name: str, category: str, target_index_name: str):
     """Queries inventory data for a specific category using a global secondary index.
 
     This function queries the DynamoDB table's specified global secondary index
     to retrieve inventory data belonging to the provided category. It calculates the
-    total price and item count for the category.
+    total price and item count for the category. Results larger than a single query page
+    are read page by page.
 
     Args:
-        table (dynamoDB.table): The DynamoDB table object.
+        table_name (str): The name of the DynamoDB table.
         category (str): The category to query for.
         target_index_name (str): The name of the GSI to use.
 
     Returns:
         A dictionary containing inventory data for the category:
     """
-    response = table.query(
-        IndexName=target_index_name,
-        KeyConditionExpression=Key("category").eq(category),
-    )
-    total_price = sum(item["price"] for item in response["Items"])
+    query_params = {
+        **CATEGORY_QUERY_TEMPLATE,
+        "TableName": table_name,
+        "IndexName": target_index_name,
+        "ExpressionAttributeValues": {":category": {"S": category}},
+    }
+    total_price = 0
+    count = 0
+    response = {}
+    while True:
+        # A query returns at most 1 MB of data, keep reading until there is no LastEvaluatedKey
+        if "LastEvaluatedKey" in response:
+            query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        response = dynamodb_client.query(**query_params)
+        for item in response["Items"]:
+            total_price += Decimal(item["price"]["N"])
+            count += 1
+        # Release the page before the next one is fetched to keep peak memory to a single page
+        del response["Items"]
+        if "LastEvaluatedKey" not in response:
+            break
+
     return {
         "category": category.capitalize(),
         "total_price": float(total_price),
-        "count": len(response["Items"]),
+        "count": count,
+    }
+
+
+def get_cached_inventory_of_category(
+    table_name: str, category: str, target_index_name: str
+):
+    """Retrieves inventory data for a specific category, cached in memory for a short time.
+
+    Warm invocations within `CACHE_TTL_SECONDS` of the last query of the same category are
+    served from the Lambda container's memory without calling DynamoDB.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        category (str): The category to query for.
+        target_index_name (str): The name of the GSI to use.
+
+    Returns:
+        A dictionary containing inventory data for the category.
+    """
+    cached = _CACHE.get(category)
+    if cached and time.monotonic() - cached[0] < CACHE_TTL_SECONDS:
+        return cached[1]
+
+    data = get_inventory_of_category(table_name, category, target_index_name)
+    _CACHE[category] = (time.monotonic(), data)
+    return data
+
+
+def scan_inventory_segment(table_name: str, target_index_name: str, segment: int):
+    """Scans one segment of a global secondary index and sums the prices by category.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        target_index_name (str): The name of the GSI to scan.
+        segment (int): The segment to scan, between 0 and `SCAN_SEGMENTS` - 1.
+
+    Returns:
+        A tuple of two dictionaries, the total price and the item count of each category in the segment.
+    """
+    scan_params = {
+        **ALL_CATEGORIES_SCAN_TEMPLATE,
+        "TableName": table_name,
+        "IndexName": target_index_name,
+        "Segment": segment,
+        "TotalSegments": SCAN_SEGMENTS,
     }
+    total_prices = defaultdict(Decimal)
+    counts = defaultdict(int)
+    response = {}
+    while True:
+        # A scan returns at most 1 MB of data, keep reading until there is no LastEvaluatedKey
+        if "LastEvaluatedKey" in response:
+            scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        response = dynamodb_client.scan(**scan_params)
+        for item in response["Items"]:
+            category = item["category"]["S"]
+            total_prices[category] += Decimal(item["price"]["N"])
+            counts[category] += 1
+        del response["Items"]
+        if "LastEvaluatedKey" not in response:
+            break
+
+    return total_prices, counts
 
 
-def get_inventory_of_all_categories(table, target_index_name: str):
+def get_inventory_of_all_categories(table_name: str, target_index_name: str):
     """Retrieves inventory data for all valid categories using a global secondary index.
 
-    This function calls `get_inventory_of_category` for each category.
-    It also filters the results to include only categories with items (count > 0).
+    If every category is still in the in-memory cache, the cached aggregates are returned.
+    Otherwise the index is scanned once, in `SCAN_SEGMENTS` segments read in parallel from the
+    module-level thread pool, and the prices are summed by category. The aggregates of all
+    categories are then cached. It also filters the results to include only categories with items (count > 0).
 
     Args:
-        table (dynamoDB.table): The DynamoDB table object.
+        table_name (str): The name of the DynamoDB table.
         target_index_name (str): The name of the global secondary index to use.
 
     Returns:
         A list of dictionaries containing inventory data for each category with items.
     """
-    categories = eval(os.environ.get("CATEGORIES"))
-    category_data = [
-        get_inventory_of_category(table, category, target_index_name)
-        for category in categories
-    ]
+    now = time.monotonic()
+    cached = [_CACHE.get(category) for category in CATEGORIES]
+    if all(entry and now - entry[0] < CACHE_TTL_SECONDS for entry in cached):
+        category_data = [entry[1] for entry in cached]
+    else:
+        total_prices = defaultdict(Decimal)
+        counts = defaultdict(int)
+        for segment_total_prices, segment_counts in _POOL.map(
+            lambda segment: scan_inventory_segment(
+                table_name, target_index_name, segment
+            ),
+            range(SCAN_SEGMENTS),
+        ):
+            for category, total_price in segment_total_prices.items():
+                total_prices[category] += total_price
+            for category, count in segment_counts.items():
+                counts[category] += count
+
+        category_data = []
+        for category in CATEGORIES:
+            data = {
+                "category": category.capitalize(),
+                "total_price": float(total_prices[category]),
+                "count": counts[category],
+            }
+            _CACHE[category] = (now, data)
+            category_data.append(data)
 
     return [data for data in category_data if data["count"] > 0]
 
 
-def handler(event, _):
+def get_cache_max_age(categories) -> int:
+    """Computes how long a response built from the cached categories may be cached downstream.
+
+    Args:
+        categories: The categories the response was built from.
+
+    Returns:
+        The remaining TTL in seconds of the oldest cache entry of the categories, or 0 if one is not cached.
+    """
+    entries = [_CACHE.get(category) for category in categories]
+    if not all(entries):
+        return 0
+    age = time.monotonic() - min(entry[0] for entry in entries)
+    return max(0, int(CACHE_TTL_SECONDS - age))
+
+
+def handler(event, context):
     """Handles HTTP GET requests to get inventory data by category.
 
     This Lambda function processes incoming HTTP GET requests with `category` query
@@ -129,66 +267,71 @@ def handler(event, _):
             - queryStringParameters: A dictionary containing the query parameter:
                 - category (str): The category to filter by.
 
-        _: The Lambda context object (not used in this function).
+        context: The Lambda context object, its remaining time bounds the wait for the GSI.
 
     Returns:
         A dictionary containing the response data:
             - On success:
+                - headers: A Cache-Control header allowing the response to be cached for the remaining TTL
+                  of the in-memory cache entries it was built from (at most 30 seconds).
                 - body: A JSON string containing an inventory object with items:
                     - items (list): A list of dictionaries containing inventory data, total_price and count for each category with items.
             - On error:
                 - statusCode (int): The HTTP status code (e.g., 400 or 500).
                 - body: A JSON string containing the error message.
     """
-    table = dynamodb.Table(os.environ.get("DB_TABLE_NAME"))
-    logging.info(f"## Loaded table: {table.name}")
+    logger.info("## Loaded table: %s", TABLE_NAME)
     try:
         # Extract parameter from event
         query_params = event["queryStringParameters"]
         target_category = query_params.get("category", "")
 
-        logging.info(f"## Received payload: {query_params}")
+        logger.info("## Received payload: %s", query_params)
 
-        # Check if category valid
-        valid_categories = get_valid_categories()
-        if not target_category or target_category not in valid_categories:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Missing or invalid category"}),
-            }
+        # Check if category valid, categories are case-insensitive
+        target_category = target_category.lower()
+        if target_category not in VALID_CATEGORIES:
+            return json_response({"error": "Missing or invalid category"}, 400)
 
         # Wait for the global secondary index to become ACTIVE
         target_index_name = "CategoryPriceIndex"
-        wait_for_index_active(table=table, index_name=target_index_name)
+        ensure_index_ready(
+            dynamodb_client,
+            table_name=TABLE_NAME,
+            index_name=target_index_name,
+            timeout=get_wait_timeout(context),
+        )
 
         # Query Global Secondary Index (CategoryPriceIndex)
         if target_category == "all":
+            categories = CATEGORIES
             body = get_inventory_of_all_categories(
-                table=table, target_index_name=target_index_name
+                table_name=TABLE_NAME, target_index_name=target_index_name
             )
         else:
+            categories = (CATEGORY_LOOKUP[target_category],)
             body = [
-                get_inventory_of_category(
-                    table=table,
-                    category=target_category,
+                get_cached_inventory_of_category(
+                    table_name=TABLE_NAME,
+                    category=categories[0],
                     target_index_name=target_index_name,
                 )
             ]
 
-        return {"body": json.dumps({"items": body})}
+        # Allow CloudFront to cache the aggregate until the cache entries it was built from expire
+        max_age = get_cache_max_age(categories)
+        return json_response(
+            {"items": body}, headers={"Cache-Control": f"public, max-age={max_age}"}
+        )
     except ClientError as err:
         logger.error(
-            f"Error {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            "Error %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": err.response["Error"]["Message"]}),
-        }
+        return json_response({"error": err.response["Error"]["Message"]}, 500)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)}),
-        }
+        logger.error("Unexpected error: %s", e)
+        return json_response({"error": str(e)}, 500)
     finally:
         logger.info("## AggregateInventoryFunction execution completed")
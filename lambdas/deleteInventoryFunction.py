@@ -1,16 +1,18 @@
-from decimal import Decimal
 import os
-import uuid
-import boto3
 import logging
-import json
 from botocore.exceptions import ClientError
-from datetime import datetime
+from common import build_missing_fields_responses, get_ddb_table, json_response, loads
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
+# Initialized once per Lambda container and reused by warm invocations
+TABLE_NAME = os.environ["DB_TABLE_NAME"]
+TABLE = get_ddb_table(TABLE_NAME)
+
+# Fields the request body must contain, reported in this order when missing
+REQUIRED_FIELDS = ("name", "category")
+MISSING_FIELDS_RESPONSES = build_missing_fields_responses(REQUIRED_FIELDS)
 
 
 def handler(event, _):
@@ -35,48 +37,36 @@ def handler(event, _):
                 - statusCode (int): The HTTP status code.
                 - body (str): A JSON string containing the error message.
     """
-    table = dynamodb.Table(os.environ.get("DB_TABLE_NAME"))
-    logging.info(f"## Loaded table: {table.name}")
+    logger.info("## Loaded table: %s", TABLE_NAME)
     try:
-        item = json.loads(event["body"])
-        logging.info(f"## Received payload: {item}")
+        item = loads(event["body"])
+        logger.info("## Received payload: %s", item)
 
         # Check existence of required fields
-        required_fields = {"name", "category"}
-        missing_fields = required_fields - set(item.keys())
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in item]
         if missing_fields:
-            error_message = f"Missing required field(s): {', '.join(missing_fields)}"
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": error_message}),
-            }
+            return MISSING_FIELDS_RESPONSES[frozenset(missing_fields)]
 
         # Delete item with same name and category(unique)
-        response = table.delete_item(
+        response = TABLE.delete_item(
             Key={"name": item["name"], "category": item["category"]}
         )
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps(
-                {
-                    "message": f"{item['name']} of {item['category']} category was deleted successfully"
-                }
-            ),
-        }
+        return json_response(
+            {
+                "message": f"{item['name']} of {item['category']} category was deleted successfully"
+            },
+            200,
+        )
     except ClientError as err:
         logger.error(
-            f"Error {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            "Error %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": err.response["Error"]["Message"]}),
-        }
+        return json_response({"error": err.response["Error"]["Message"]}, 500)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)}),
-        }
+        logger.error("Unexpected error: %s", e)
+        return json_response({"error": str(e)}, 500)
     finally:
         logger.info("## DeleteInventoryFunction execution completed")
@@ -1,70 +1,41 @@
 import os
-import boto3
 from boto3.dynamodb.conditions import Key
 import logging
-import json
-import time
 from botocore.exceptions import ClientError
 import dateutil.parser as parser
+from common import (
+    ensure_index_ready,
+    get_ddb_table,
+    get_wait_timeout,
+    json_response,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-
-
-def wait_for_index_active(table, index_name: str):
-    """Waits until the specified global secondary index(GSI) to become ACTIVE.
-
-    This function continuously checks the status of the specific GSI
-    of a DynamoDB table until it becomes active. It logs a message every 5 seconds
-    indicating that it's waiting for the index to backfill.
-
-    Args:
-        table: The DynamoDB table object.
-        index_name: The name of the GSI to wait for.
-
-    Raises:
-        RuntimeError: If the index does not become active within a reasonable time.
-    """
-
-    def is_index_active(indexes, index_name):
-        for index in indexes:
-            if index["IndexName"] == index_name:
-                return index["IndexStatus"] == "ACTIVE"
-        return False
-
-    while True:
-        if not table.global_secondary_indexes or not is_index_active(
-            indexes=table.global_secondary_indexes, index_name=index_name
-        ):
-            print("Waiting for index to backfill...")
-            time.sleep(5)
-            table.reload()
-        else:
-            break
+# Initialized once per Lambda container and reused by warm invocations
+TABLE_NAME = os.environ["DB_TABLE_NAME"]
+TABLE = get_ddb_table(TABLE_NAME)
 
 
 def filter_unnecessary_attributes(items: list[dict]) -> list[dict]:
     """Filter out unnecessary attributes(static_pk and last_updated_dt)
 
+    The items are modified in place instead of being copied, they are only used to build the response.
+
     Args:
         items (list[dict]): items to filter
 
     Returns:
         list[dict]: items without static_pk and last_updated_dt attribute
     """
-    # Attributes to filter away
-    attributes_to_filter = ["static_pk", "last_updated_dt"]
-
-    # Filtered list of items without the above attributes
-    return [
-        {key: value for key, value in item.items() if key not in attributes_to_filter}
-        for item in items
-    ]
+    for item in items:
+        item.pop("static_pk", None)
+        item.pop("last_updated_dt", None)
+    return items
 
 
-def handler(event, _):
+def handler(event, context):
     """Filter items by date range
 
     This function filters items in a DynamoDB table based on a date time range(dt_from, dt_to) specified in the query parameters.
@@ -73,10 +44,10 @@ def handler(event, _):
     Args:
         event (dict): The API event object that should include a 'queryStringParameters' field with 'dt_from' & 'dt_to' keys,
             representing the start and end of the date time range to filter.
-        _ (Any): The second parameter is not used
+        context (Any): The Lambda context object, its remaining time bounds the wait for the GSI
 
     Returns:
-        dict: filtered items within the specified date range and the total price
+        dict: a response whose body is a JSON string of the filtered items within the specified date range and the total price
             - 'items' (list[dict]): A list of filtered items
             - 'total_price' (float): The total price of all filtered items
 
@@ -84,23 +55,19 @@ def handler(event, _):
         ClientError: If there is an error while querying the DynamoDB table
         Exception: If an unexpected error occurs during execution
     """
-    table = dynamodb.Table(os.environ.get("DB_TABLE_NAME"))
-    logging.info(f"## Loaded table: {table.name}")
+    logger.info("## Loaded table: %s", TABLE_NAME)
     try:
         # Check if parameters exists and extract from event
         query_params = event["queryStringParameters"]
         dt_from = query_params.get("dt_from", "")
         dt_to = query_params.get("dt_to", "")
-        logging.info(f"## Received payload: {query_params}")
+        logger.info("## Received payload: %s", query_params)
 
         # Check if parameters exists
         if not dt_from or not dt_to:
-            return {
-                "statusCode": 400,
-                "body": json.dumps(
-                    {"error": "Missing required query parameters 'dt_from' or 'dt_to'"}
-                ),
-            }
+            return json_response(
+                {"error": "Missing required query parameters 'dt_from' or 'dt_to'"}, 400
+            )
 
         # Parse dt_from and dt_to iso format so that can compare with the values in db
         dt_from = parser.parse(dt_from).isoformat()
@@ -108,10 +75,15 @@ def handler(event, _):
 
         # Wait for the global secondary index to become ACTIVE
         target_index_name = "ItemsLastUpdatedDtIndex"
-        wait_for_index_active(table=table, index_name=target_index_name)
+        ensure_index_ready(
+            TABLE.meta.client,
+            table_name=TABLE_NAME,
+            index_name=target_index_name,
+            timeout=get_wait_timeout(context),
+        )
 
         # Query ItemsLastUpdatedDtIndex Index with partition and sort key
-        response = table.query(
+        response = TABLE.query(
             IndexName=target_index_name,
             KeyConditionExpression=Key("static_pk").eq("PRODUCT")
             & Key("last_updated_dt").between(
@@ -120,27 +92,23 @@ def handler(event, _):
             ),
         )
         # Calculate total price of filtered item
-        total_price = sum(item["price"] for item in response["Items"])
+        total_price = sum([item["price"] for item in response["Items"]])
 
-        return {
-            "body": {
+        return json_response(
+            {
                 "items": filter_unnecessary_attributes(response["Items"]),
                 "total_price": total_price,
             }
-        }
+        )
     except ClientError as err:
         logger.error(
-            f"Error {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            "Error %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": err.response["Error"]["Message"]}),
-        }
+        return json_response({"error": err.response["Error"]["Message"]}, 500)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)}),
-        }
+        logger.error("Unexpected error: %s", e)
+        return json_response({"error": str(e)}, 500)
     finally:
         logger.info("## FilterByDateRangeFunction execution completed")
@@ -1,12 +1,89 @@
-from decimal import Decimal
-import os, boto3, json, logging
+import os, base64, binascii, logging
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeDeserializer
+from common import (
+    InvalidPriceError,
+    dumps,
+    get_ddb_client,
+    json_response,
+    loads,
+    to_price,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
+# Low-level client, the expressions below are plain strings so no condition objects are built per call
+dynamodb_client = get_ddb_client()
+deserializer = TypeDeserializer()
+# Initialized once per Lambda container and reused by warm invocations
+TABLE_NAME = os.environ["DB_TABLE_NAME"]
+
+# Static parts of the query parameters, shared by every request
+QUERY_PARAMS_TEMPLATE = {
+    "ProjectionExpression": "id, #name, category, price",
+    "ExpressionAttributeNames": {"#name": "name"},
+}
+# Every item has the same static partition key in the price and last_updated_dt indexes
+PRODUCT_KEY_CONDITION = "static_pk = :static_pk"
+PRODUCT_KEY_VALUES = {":static_pk": {"S": "PRODUCT"}}
+TABLE_KEY_ATTRIBUTES = {"name", "category"}
+# Lowercased phrases of the DynamoDB validation errors caused by an invalid ExclusiveStartKey
+START_KEY_MENTIONS = ("exclusivestartkey", "start key", "starting key")
+
+
+def deserialize_item(item: dict) -> dict:
+    """Converts an item returned by the low-level client into a plain dictionary.
+
+    Args:
+        item (dict): The item in DynamoDB JSON (eg: {"price": {"N": "10"}}).
+
+    Returns:
+        The item with Python values (eg: {"price": Decimal("10")}).
+    """
+    return {key: deserializer.deserialize(value) for key, value in item.items()}
+
+
+def encode_cursor(last_evaluated_key: dict) -> str:
+    """Encodes the LastEvaluatedKey of a query into an opaque cursor for the next page.
+
+    Args:
+        last_evaluated_key (dict): The LastEvaluatedKey returned by DynamoDB.
+
+    Returns:
+        The URL-safe base64 encoded key.
+    """
+    return base64.urlsafe_b64encode(dumps(last_evaluated_key).encode()).decode()
+
+
+class InvalidCursorError(ValueError):
+    """Raised when the cursor of a request was not returned by a previous page of the same query."""
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodes a cursor returned by `encode_cursor` back into an ExclusiveStartKey.
+
+    Args:
+        cursor (str): The cursor sent in the request.
+
+    Returns:
+        The key to start the query from.
+
+    Raises:
+        InvalidCursorError: If the cursor is not an encoded DynamoDB key.
+    """
+    try:
+        key = loads(base64.urlsafe_b64decode(cursor))
+    except (binascii.Error, TypeError, ValueError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    # Every LastEvaluatedKey contains the primary key of the table, whatever the queried index
+    if (
+        not isinstance(key, dict)
+        or not TABLE_KEY_ATTRIBUTES <= key.keys()
+        or not all(isinstance(value, dict) for value in key.values())
+    ):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return key
 
 
 def build_dynamodb_query_params(
@@ -33,6 +110,7 @@ def build_dynamodb_query_params(
         pagination: A dictionary containing optional pagination details:
             - limit (int): The maximum number of items to retrieve per page (default: 10).
             - page (int): The specific page number to retrieve (default: 1).
+            - cursor (str): The cursor of the page to retrieve, returned with the previous page.
 
     Returns:
         A dictionary containing the constructed DynamoDB query parameters.
@@ -40,57 +118,173 @@ def build_dynamodb_query_params(
     name = filters.get("name", "")
     category = filters.get("category", "")
     price_range = filters.get("price_range", [])
-    min_price = Decimal(str(price_range[0])) if price_range else None
-    max_price = Decimal(str(price_range[1])) if price_range else None
+    min_price = to_price(price_range[0]) if price_range else None
+    max_price = to_price(price_range[1]) if price_range else None
     page_size = int(pagination.get("limit", 10))
 
     # Initialize dynamodb query parameters
-    params = {
-        "TableName": table_name,
-        "ProjectionExpression": "id, #name, category, price",
-        "ExpressionAttributeNames": {"#name": "name"},
-        "Limit": page_size,
-    }
+    params = {**QUERY_PARAMS_TEMPLATE, "TableName": table_name, "Limit": page_size}
 
-    key_condition = None
+    key_conditions = []
+    expression_values = {}
     filter_expression = None
+    price_between = "price BETWEEN :min_price AND :max_price"
+    if min_price is not None and max_price is not None:
+        expression_values[":min_price"] = {"N": min_price}
+        expression_values[":max_price"] = {"N": max_price}
 
     # Define the key condition expression for the query based on the query params
     if name:
-        key_condition = Key("name").eq(name)
+        key_conditions.append("#name = :name")
+        expression_values[":name"] = {"S": name}
         if sort and sort["field"] == "price" and sort["order"] == "desc":
             params["ScanIndexForward"] = False
         if category:
-            key_condition &= Key("category").eq(category)
-        if min_price and max_price:
-            filter_expression = Attr("price").between(min_price, max_price)
+            key_conditions.append("category = :category")
+            expression_values[":category"] = {"S": category}
+        if min_price is not None and max_price is not None:
+            filter_expression = price_between
     elif category:
         params["IndexName"] = "CategoryPriceIndex"
-        key_condition = Key("category").eq(category)
+        key_conditions.append("category = :category")
+        expression_values[":category"] = {"S": category}
         if sort and sort["field"] == "price" and sort["order"] == "desc":
             params["ScanIndexForward"] = False
-        if min_price and max_price:
-            key_condition &= Key("price").between(min_price, max_price)
-    elif min_price and max_price:
+        if min_price is not None and max_price is not None:
+            key_conditions.append(price_between)
+    elif min_price is not None and max_price is not None:
         params["IndexName"] = "ItemsPriceIndex"
-        key_condition = Key("static_pk").eq("PRODUCT") & Key("price").between(
-            min_price, max_price
-        )
+        key_conditions.append(PRODUCT_KEY_CONDITION)
+        key_conditions.append(price_between)
+        expression_values.update(PRODUCT_KEY_VALUES)
 
     else:
         # If no filters are given, return all items paginated, and sorted by last_updated_dt by default
         params["IndexName"] = "ItemsLastUpdatedDtIndex"
-        key_condition = Key("static_pk").eq("PRODUCT")
+        key_conditions.append(PRODUCT_KEY_CONDITION)
+        expression_values.update(PRODUCT_KEY_VALUES)
         if sort and sort["field"] == "last_updated_dt" and sort["order"] == "desc":
             params["ScanIndexForward"] = False
 
-    params["KeyConditionExpression"] = key_condition
+    params["KeyConditionExpression"] = " AND ".join(key_conditions)
+    params["ExpressionAttributeValues"] = expression_values
     if filter_expression:
         params["FilterExpression"] = filter_expression
 
     return params
 
 
+def build_page(response: dict, page_size: int) -> dict:
+    """Builds the response body of a page from a DynamoDB query response.
+
+    Args:
+        response (dict): The response of the query of the page.
+        page_size (int): The maximum number of items per page.
+
+    Returns:
+        A dictionary containing the items of the page, their count, the page size and
+        the cursor of the next page, or None if this is the last page.
+    """
+    last_evaluated_key = response.get("LastEvaluatedKey")
+    return {
+        "items": [deserialize_item(item) for item in response["Items"]],
+        "count": response["Count"],
+        "limit": page_size,
+        "cursor": encode_cursor(last_evaluated_key) if last_evaluated_key else None,
+    }
+
+
+def get_page(query_params: dict, page: int, page_size: int) -> dict:
+    """Retrieves a single page of query results.
+
+    The pages before the requested one are read only to get their LastEvaluatedKey,
+    their items are discarded without being deserialized.
+    To read the following pages without going through the previous ones again, use `get_page_from_cursor`.
+
+    Args:
+        query_params (dict): The DynamoDB query parameters built by `build_dynamodb_query_params`.
+        page (int): The page number to retrieve, starting from 1.
+        page_size (int): The maximum number of items per page.
+
+    Returns:
+        A dictionary containing the items of the page, their count, the page number, the page size
+        and the cursor of the next page. If the page is after the last page, no items are returned.
+    """
+    current_page = 1
+    while True:
+        response = dynamodb_client.query(**query_params)
+        if current_page == page:
+            break
+
+        # If no LastEvaluatedKey means there is no more page to retrieve
+        if "LastEvaluatedKey" not in response:
+            response = {"Items": [], "Count": 0}
+            break
+
+        query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        current_page += 1
+
+    return {**build_page(response, page_size), "page": page}
+
+
+def get_page_from_cursor(query_params: dict, cursor: str, page_size: int) -> dict:
+    """Retrieves the page starting at a cursor with a single query.
+
+    Args:
+        query_params (dict): The DynamoDB query parameters built by `build_dynamodb_query_params`.
+            They must be the same as the ones of the query that returned the cursor.
+        cursor (str): The cursor returned with the previous page.
+        page_size (int): The maximum number of items per page.
+
+    Returns:
+        A dictionary containing the items of the page, their count, the page size and the cursor of the next page.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or is not a key of the queried table or index.
+    """
+    try:
+        response = dynamodb_client.query(
+            **query_params, ExclusiveStartKey=decode_cursor(cursor)
+        )
+    except ClientError as err:
+        # DynamoDB rejects start keys that do not match the key schema of the query.
+        # Other validation errors are not caused by the cursor and are raised as is
+        error = err.response["Error"]
+        message = error.get("Message", "").lower()
+        if error["Code"] == "ValidationException" and any(
+            mention in message for mention in START_KEY_MENTIONS
+        ):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from err
+        raise
+    return build_page(response, page_size)
+
+
+def count_items(query_params: dict) -> int:
+    """Counts the items matching a query without reading them.
+
+    The query is run with `Select="COUNT"`, so DynamoDB only returns the number of matching items.
+    The pagination of the query params is ignored, every matching item is counted.
+
+    Args:
+        query_params (dict): The DynamoDB query parameters built by `build_dynamodb_query_params`.
+
+    Returns:
+        The number of items matching the query.
+    """
+    count_params = {
+        key: value
+        for key, value in query_params.items()
+        if key not in ("ProjectionExpression", "Limit")
+    }
+    count_params["Select"] = "COUNT"
+    # DynamoDB rejects attribute names that are not used by any expression
+    if "#name" not in count_params["KeyConditionExpression"]:
+        del count_params["ExpressionAttributeNames"]
+
+    paginator = dynamodb_client.get_paginator("query")
+    return sum(response["Count"] for response in paginator.paginate(**count_params))
+
+
 def handler(event, _):
     """Handles HTTP POST requests to query data.
 
@@ -102,28 +296,31 @@ def handler(event, _):
     Args:
         event (dict): The HTTP event containing the request data.
             - body (str): The JSON payload containing filters, sort, and pagination information.
+                With `select: "COUNT"`, only the number of matching items is returned.
         _: The Lambda context object (not used in this function).
 
     Returns:
-        - On success:
-            - If pagination is specified in request payload (eg: `page: 1`):
+        - On success, a dictionary with a body containing a JSON string of:
+            - If `select: "COUNT"` is specified in request payload:
+                - A dictionary containing the number of matching items (eg: {"count": 3}).
+            - If pagination is specified in request payload (eg: `page: 1` or `cursor: "..."`):
                 - A dictionary containing these:
                     - items (list): A list of matching items for the requested page.
                     - count (int): The total number of items matching the filters in the page.
                     - page (int): The requested page number (if applicable).
                     - limit (int): The number of items per page.
+                    - cursor (str): The cursor to request the next page with, None on the last page.
             - If pagination is NOT specified:
                 - A list of dictionaries consisting of all matching items. eg: [{item 1 attributes & vals}, {item 2 attributes & vals}, ...]
         - On error:
             - statusCode (int): The HTTP status code (e.g., 500).
             - body (str): A JSON string containing the error message.
     """
-    table = dynamodb.Table(os.environ.get("DB_TABLE_NAME"))
-    logging.info(f"## Loaded table name: {table.name}")
+    logger.info("## Loaded table name: %s", TABLE_NAME)
     try:
         # Extract parameters from event
-        body = json.loads(event["body"])
-        logging.info(f"## Received payload: {body}")
+        body = loads(event["body"])
+        logger.info("## Received payload: %s", body)
 
         filters = body.get("filters", {})
         pagination = body.get("pagination", {})
@@ -135,54 +332,41 @@ def handler(event, _):
 
         # Build query parameters based on optional filters, sort and pagination parameters
         dynamodb_query_params = build_dynamodb_query_params(
-            table.name, filters, sort, pagination
+            TABLE_NAME, filters, sort, pagination
         )
 
-        # data is a dictionary to return only a list of items of a specific page if page is specified
-        data = {}
-        # combined_list is a list that consists of all queried items
+        if body.get("select") == "COUNT":
+            return json_response({"count": count_items(dynamodb_query_params)})
+
+        # Only return data of a specific page if page or cursor is specified,
+        # else return all data in a list(For frontend).
+        # The cursor of the last page is null, sending it back starts from the first page.
+        if pagination.get("cursor"):
+            return json_response(
+                get_page_from_cursor(
+                    dynamodb_query_params, pagination["cursor"], page_size
+                )
+            )
+        if "page" in pagination or "cursor" in pagination:
+            return json_response(get_page(dynamodb_query_params, page, page_size))
+
         combined_items = []
-        while True:
-            response = table.query(**dynamodb_query_params)
-
-            data[page] = {
-                "items": response["Items"],
-                "count": response["Count"],
-                "page": page,
-                "limit": page_size,
-            }
-
-            for page_data in response["Items"]:
-                combined_items.append(page_data)
-
-            # If no LastEvaluatedKey means no more items to retrieve
-            if "LastEvaluatedKey" not in response:
-                break
-
-            # If there are possibly more items, update the start key for the next page
-            dynamodb_query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-            page += 1
-
-        """ Only return data of a specific page if page is specified,
-        else return all data in a list(For frontend)."""
-        return_data = combined_items
-        if pagination and "page" in pagination.keys():
-            return_data = data[pagination["page"]]
-
-        return return_data
+        paginator = dynamodb_client.get_paginator("query")
+        for response in paginator.paginate(**dynamodb_query_params):
+            combined_items.extend(deserialize_item(item) for item in response["Items"])
+
+        return json_response(combined_items)
+    except (InvalidPriceError, InvalidCursorError) as e:
+        return json_response({"error": str(e)}, 400)
     except ClientError as err:
         logger.error(
-            f"Error {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            "Error %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": err.response["Error"]["Message"]}),
-        }
+        return json_response({"error": err.response["Error"]["Message"]}, 500)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)}),
-        }
+        logger.error("Unexpected error: %s", e)
+        return json_response({"error": str(e)}, 500)
     finally:
         logger.info("## QueryInventoryFunction execution completed")
@@ -1,16 +1,42 @@
-from decimal import Decimal
 import os
 import uuid
-import boto3
 import logging
-import json
 from botocore.exceptions import ClientError
-from datetime import datetime
+from datetime import datetime, timezone
+from common import (
+    InvalidPriceError,
+    build_missing_fields_responses,
+    get_ddb_client,
+    json_response,
+    loads,
+    prime_client,
+    to_price,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
+# Initialized once per Lambda container and reused by warm invocations
+TABLE_NAME = os.environ["DB_TABLE_NAME"]
+# Low-level client, the values are sent already typed so the resource layer's marshalling is skipped
+dynamodb_client = get_ddb_client()
+prime_client(dynamodb_client)
+
+# Fields the request body must contain, reported in this order when missing
+REQUIRED_FIELDS = ("name", "category", "price")
+MISSING_FIELDS_RESPONSES = build_missing_fields_responses(REQUIRED_FIELDS)
+
+# Static part of the update, only the key and the values change between calls.
+# The price and last_updated_dt are always set, the static_pk and id only when the item is created
+UPDATE_EXPRESSION = "SET #price=:price, #last_updated_dt=:last_updated_dt, #static_pk=if_not_exists(#static_pk, :static_pk), #id=if_not_exists(#id, :id)"
+UPDATE_ATTRIBUTE_NAMES = {
+    "#price": "price",
+    "#static_pk": "static_pk",
+    "#last_updated_dt": "last_updated_dt",
+    "#id": "id",
+}
+# Writes are skipped when the price did not change, the existing item is returned in the error instead
+UPDATE_CONDITION = "attribute_not_exists(#price) OR #price <> :price"
 
 
 def handler(event, _):
@@ -18,7 +44,7 @@ def handler(event, _):
 
     This Lambda function processes incoming HTTP POST requests containing a JSON payload
     with details for an inventory item. It will update an existing item's price with the same name and category
-    or a new item is created if none exists.
+    or a new item is created if none exists. If the price is unchanged, nothing is written and the existing item's ID is returned.
 
     Args:
         event (dict): The HTTP event containing the request data.
@@ -37,56 +63,52 @@ def handler(event, _):
                 - statusCode (int): The HTTP status code.
                 - body (str): A JSON string containing the error message.
     """
-    table = dynamodb.Table(os.environ.get("DB_TABLE_NAME"))
-    logging.info(f"## Loaded table: {table.name}")
+    logger.info("## Loaded table: %s", TABLE_NAME)
     try:
-        item = json.loads(event["body"])
-        logging.info(f"## Received payload: {item}")
+        item = loads(event["body"])
+        logger.info("## Received payload: %s", item)
 
         # Check existence of required fields
-        required_fields = {"name", "category", "price"}
-        missing_fields = required_fields - set(item.keys())
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in item]
         if missing_fields:
-            error_message = f"Missing required field(s): {', '.join(missing_fields)}"
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": error_message}),
-            }
+            return MISSING_FIELDS_RESPONSES[frozenset(missing_fields)]
 
         # Update or Create with dynamodb update_item()
-        now = datetime.now()
-        response = table.update_item(
-            Key={"name": item["name"], "category": item["category"]},
-            UpdateExpression="SET #price=:price, #last_updated_dt=:last_updated_dt, #static_pk=if_not_exists(#static_pk, :static_pk), #id=if_not_exists(#id, :id)",
-            ExpressionAttributeNames={
-                "#price": "price",
-                "#static_pk": "static_pk",
-                "#last_updated_dt": "last_updated_dt",
-                "#id": "id",
-            },
+        response = dynamodb_client.update_item(
+            TableName=TABLE_NAME,
+            Key={"name": {"S": item["name"]}, "category": {"S": item["category"]}},
+            UpdateExpression=UPDATE_EXPRESSION,
+            ExpressionAttributeNames=UPDATE_ATTRIBUTE_NAMES,
             ExpressionAttributeValues={
-                ":price": Decimal(str(item["price"])),
-                ":static_pk": "PRODUCT",
-                ":last_updated_dt": now.isoformat(),
-                ":id": str(uuid.uuid4()),
+                ":price": {"N": to_price(item["price"])},
+                ":static_pk": {"S": "PRODUCT"},
+                # Stored as naive UTC to stay comparable with the existing last_updated_dt values
+                ":last_updated_dt": {
+                    "S": datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+                },
+                ":id": {"S": str(uuid.uuid4())},
             },
+            ConditionExpression=UPDATE_CONDITION,
             ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
-        logging.info(f"## Response: {response}")
-        return {"body": json.dumps({"id": response["Attributes"]["id"]})}
+        logger.debug("## Response: %s", response)
+        return json_response({"id": response["Attributes"]["id"]["S"]})
+    except InvalidPriceError as e:
+        return json_response({"error": str(e)}, 400)
     except ClientError as err:
+        if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            # Same price as the stored item, nothing was written
+            logger.info("## Price unchanged, skipped the update")
+            return json_response({"id": err.response["Item"]["id"]["S"]})
         logger.error(
-            f"Error {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            "Error %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": err.response["Error"]["Message"]}),
-        }
+        return json_response({"error": err.response["Error"]["Message"]}, 500)
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)}),
-        }
+        logger.error("Unexpected error: %s", e)
+        return json_response({"error": str(e)}, 500)
     finally:
         logger.info("## UpsertInventoryFunction execution completed")
@@ -0,0 +1,266 @@
+"""Helpers shared by the inventory Lambda functions.
+
+This package is deployed as a Lambda layer (layers/common) and is importable as `common`
+from every function.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from itertools import combinations
+from decimal import Decimal
+import boto3
+from botocore.config import Config
+
+try:
+    import orjson
+except (
+    ImportError
+):  # orjson is optional, the standard library is used when it is not installed in the layer
+    orjson = None
+
+logger = logging.getLogger()
+
+# Connection pool is sized above the parallel query fan-out of the aggregate function,
+# and kept alive so warm invocations reuse connections instead of handshaking again
+BOTO_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 3},
+    # Fail fast on a stuck connection instead of waiting the 60 seconds botocore default
+    connect_timeout=1,
+    read_timeout=2,
+)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Prices are non-negative numbers, eg: 10, 10.5 or 1e-05 as floats are formatted by str()
+PRICE_PATTERN = re.compile(r"\d+(\.\d+)?([eE][+-]?\d{1,3})?", re.ASCII)
+# Range of the DynamoDB number type: up to 38 significant digits, magnitudes between 1E-130 and 9.99...E+125
+MAX_PRICE_DIGITS = 38
+MIN_PRICE_EXPONENT = -130
+MAX_PRICE_EXPONENT = 125
+
+# (table name, index name) of the GSIs already seen ACTIVE in this Lambda container
+_READY_INDEXES: set[tuple[str, str]] = set()
+
+
+class InvalidPriceError(ValueError):
+    """Raised when a price of a request is not a non-negative number DynamoDB can store."""
+
+
+def get_ddb_client():
+    """Creates a low-level DynamoDB client with the shared configuration.
+
+    Returns:
+        The DynamoDB client.
+    """
+    return boto3.client("dynamodb", config=BOTO_CONFIG)
+
+
+def get_ddb_table(table_name: str):
+    """Creates a DynamoDB Table resource with the shared configuration.
+
+    Args:
+        table_name: The name of the DynamoDB table.
+
+    Returns:
+        The DynamoDB Table resource. Its low-level client is available as `table.meta.client`.
+    """
+    return boto3.resource("dynamodb", config=BOTO_CONFIG).Table(table_name)
+
+
+def prime_client(dynamodb_client):
+    """Opens the client's connection to DynamoDB ahead of the first request.
+
+    This only runs in provisioned concurrency environments, which are initialized before any request is
+    routed to them, so the TLS handshake is done during initialization instead of on the first request.
+    In on-demand environments initialization is part of the cold start, so nothing is done.
+
+    Args:
+        dynamodb_client: The low-level DynamoDB client to prime.
+    """
+    if os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") != "provisioned-concurrency":
+        return
+    try:
+        dynamodb_client.describe_endpoints()
+    except Exception as e:
+        # Priming is best effort, the first request opens the connection otherwise
+        logger.warning("Could not prime the DynamoDB client: %s", e)
+
+
+def get_wait_timeout(context, margin: float = 1.0, default: float = 60) -> float:
+    """Computes how long an invocation can wait before it has to respond.
+
+    Args:
+        context: The Lambda context object, None when the handler is called directly (eg: in tests).
+        margin: The number of seconds kept to build and return the response.
+        default: The number of seconds returned when there is no context.
+
+    Returns:
+        The remaining time of the invocation in seconds minus `margin`, never negative.
+    """
+    if context is None:
+        return default
+    return max(0.0, context.get_remaining_time_in_millis() / 1000 - margin)
+
+
+def ensure_index_ready(
+    dynamodb_client, table_name: str, index_name: str, timeout: float = 60
+):
+    """Waits until the specified global secondary index(GSI) to become ACTIVE.
+
+    The check only runs once per index per Lambda container. Once the index has been seen ACTIVE,
+    later (warm) invocations return immediately without calling DescribeTable.
+    While the index is backfilling, the table is described again with an
+    exponential backoff (0.5s, 1s, 2s, then every 4s), for at most `timeout` seconds.
+
+    Args:
+        dynamodb_client: The low-level DynamoDB client.
+        table_name: The name of the DynamoDB table.
+        index_name: The name of the GSI to wait for.
+        timeout: The maximum number of seconds to wait for.
+
+    Raises:
+        RuntimeError: If the index does not become active within `timeout` seconds.
+    """
+    if (table_name, index_name) in _READY_INDEXES:
+        return
+
+    def is_index_active(indexes, index_name):
+        for index in indexes:
+            if index["IndexName"] == index_name:
+                return index["IndexStatus"] == "ACTIVE"
+        return False
+
+    def describe_indexes():
+        table = dynamodb_client.describe_table(TableName=table_name)["Table"]
+        return table.get("GlobalSecondaryIndexes", [])
+
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while not is_index_active(indexes=describe_indexes(), index_name=index_name):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError(
+                f"Index {index_name} did not become active within {timeout} seconds"
+            )
+        logger.info("Waiting for index to backfill...")
+        # Never sleep past the deadline
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 4)
+
+    _READY_INDEXES.add((table_name, index_name))
+
+
+def _default(obj):
+    """Serializes the values that are not JSON types, the DynamoDB numbers(Decimal) are converted to float."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> str:
+    """Serializes an object to a JSON string.
+
+    orjson is used if it is installed, as it is several times faster than the standard library
+    on large responses.
+
+    Args:
+        obj: The object to serialize. It can contain Decimal values.
+
+    Returns:
+        The JSON string.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, default=_default)
+
+
+def loads(data):
+    """Deserializes a JSON string, with orjson if it is installed.
+
+    Args:
+        data: The JSON string or bytes (eg: the body of the HTTP event).
+
+    Returns:
+        The deserialized object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_price(value) -> str:
+    """Converts a price of a request to the string sent to DynamoDB as a number.
+
+    Prices sent as JSON strings are passed through unchanged, so they are stored without any precision loss.
+    Floats are formatted with str(), which gives the shortest string that reads back as the same float.
+    Only ASCII digits are accepted, and the number must fit in the DynamoDB number type.
+
+    Args:
+        value: The price in integer, decimal or string format.
+
+    Returns:
+        The price as a string (eg: "10.5").
+
+    Raises:
+        InvalidPriceError: If the value is not a non-negative number DynamoDB can store.
+    """
+    price = str(value)
+    if not PRICE_PATTERN.fullmatch(price):
+        raise InvalidPriceError(f"Invalid price: {price}")
+    number = Decimal(price)
+    if number:
+        # Leading and trailing zeros are not significant
+        digits = "".join(map(str, number.as_tuple().digits)).strip("0")
+        if (
+            len(digits) > MAX_PRICE_DIGITS
+            or not MIN_PRICE_EXPONENT <= number.adjusted() <= MAX_PRICE_EXPONENT
+        ):
+            raise InvalidPriceError(f"Invalid price: {price}")
+    return price
+
+
+def json_response(body, status_code: int = 200, headers: dict = None) -> dict:
+    """Builds a Lambda proxy response with a JSON body.
+
+    The status code and Content-Type are always set, so API Gateway sends the body to the client
+    as the response instead of the whole dictionary.
+
+    Args:
+        body: The response body, serialized to JSON with `dumps`.
+        status_code (int, optional): The HTTP status code (default: 200).
+        headers (dict, optional): Additional response headers.
+
+    Returns:
+        A dictionary containing the response data.
+    """
+    return {
+        "statusCode": status_code,
+        "headers": {**JSON_HEADERS, **(headers or {})},
+        "body": dumps(body),
+    }
+
+
+def build_missing_fields_responses(required_fields: tuple[str, ...]) -> dict:
+    """Builds the 400 responses for every combination of missing required fields.
+
+    The responses are built once at cold start, so the validation error path does not serialize anything.
+
+    Args:
+        required_fields: The fields the request body must contain, in the order they are reported.
+
+    Returns:
+        A dictionary of missing fields (frozenset) to the response listing them (eg: "Missing required field(s): name, price").
+    """
+    responses = {}
+    for size in range(1, len(required_fields) + 1):
+        for missing_fields in combinations(required_fields, size):
+            error_message = f"Missing required field(s): {', '.join(missing_fields)}"
+            responses[frozenset(missing_fields)] = json_response(
+                {"error": error_message}, 400
+            )
+    return responses
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Lambda layers are extracted to /opt/python at runtime, mirror that for the tests
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "layers", "common", "python")
+)
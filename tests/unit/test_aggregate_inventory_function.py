@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import uuid
 from decimal import Decimal
 import pytest
@@ -7,24 +8,41 @@ from moto import mock_aws
 from unittest.mock import patch
 import boto3
 
-from lambdas.aggregateInventoryFunction import get_valid_categories
 from inventory_management_system.data_model.dynamodb_data_model import (
     CategoryEnum,
 )
-from lambdas.aggregateInventoryFunction import handler
+
+# The lambda reads its configuration once at import time
+os.environ["DB_TABLE_NAME"] = "TestTable"
+os.environ["CATEGORIES"] = json.dumps(CategoryEnum.list())
+
+from lambdas.aggregateInventoryFunction import (
+    get_canonical_categories,
+    get_category_lookup,
+    get_inventory_of_category,
+)
+from lambdas import aggregateInventoryFunction
+from lambdas.aggregateInventoryFunction import get_cached_inventory_of_category, handler
+
+
+@pytest.fixture(autouse=True)
+def clear_aggregate_cache():
+    # Every test starts with a cold in-memory cache
+    aggregateInventoryFunction._CACHE.clear()
 
 
 @pytest.fixture
 def environment_variable():
-    os.environ["CATEGORIES"] = str(CategoryEnum.list())
+    os.environ["CATEGORIES"] = json.dumps(CategoryEnum.list())
 
 
-@pytest.fixture
-def dynamodb_mock():
+@pytest.fixture(scope="module")
+def dynamodb_table():
+    # The table is created once for all the tests of this module, see dynamodb_mock
     with mock_aws():
         dynamodb = boto3.resource("dynamodb")
         table_name = "TestTable"
-        dynamodb.create_table(
+        table = dynamodb.create_table(
             TableName=table_name,
             KeySchema=[
                 {"AttributeName": "name", "KeyType": "HASH"},
@@ -52,70 +70,79 @@ def dynamodb_mock():
             ],
         )
         os.environ["DB_TABLE_NAME"] = table_name
-        yield table_name
+        yield table
+
+
+@pytest.fixture
+def dynamodb_mock(dynamodb_table):
+    yield dynamodb_table
+    # Empty the table so every test starts from the same state
+    with dynamodb_table.batch_writer() as batch:
+        for item in dynamodb_table.scan()["Items"]:
+            batch.delete_item(Key={"name": item["name"], "category": item["category"]})
 
 
 @pytest.fixture
 def target_items(dynamodb_mock):
-    table = boto3.resource("dynamodb").Table(dynamodb_mock)
     # Pre-insert target item into the table(category = Music)
-    table.put_item(
-        Item={
-            "name": "target_product_1",
-            "category": "Music",
-            "price": Decimal("90.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-02-02T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
-    table.put_item(
-        Item={
-            "name": "target_product_2",
-            "category": "Music",
-            "price": Decimal("10.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-03-03T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
+    with dynamodb_mock.batch_writer() as batch:
+        batch.put_item(
+            Item={
+                "name": "target_product_1",
+                "category": "Music",
+                "price": Decimal("90.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-02-02T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
+        batch.put_item(
+            Item={
+                "name": "target_product_2",
+                "category": "Music",
+                "price": Decimal("10.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-03-03T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
 
 
 @pytest.fixture
 def other_items(dynamodb_mock):
-    table = boto3.resource("dynamodb").Table(dynamodb_mock)
     # Pre-insert others item into the table(category = Beauty, Electrics)
-    table.put_item(
-        Item={
-            "name": "beauty_product",
-            "category": "Beauty",
-            "price": Decimal("20"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-02-01T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
-    table.put_item(
-        Item={
-            "name": "beauty_product_2",
-            "category": "Beauty",
-            "price": Decimal("40"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-02-01T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
+    with dynamodb_mock.batch_writer() as batch:
+        batch.put_item(
+            Item={
+                "name": "beauty_product",
+                "category": "Beauty",
+                "price": Decimal("20"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-02-01T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
+        batch.put_item(
+            Item={
+                "name": "beauty_product_2",
+                "category": "Beauty",
+                "price": Decimal("40"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-02-01T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
 
-    table.put_item(
-        Item={
-            "name": "furniture product",
-            "category": "Electrics",
-            "price": Decimal("10.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-03-04T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
+        batch.put_item(
+            Item={
+                "name": "furniture product",
+                "category": "Electrics",
+                "price": Decimal("10.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-03-04T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
 
 
 def test_handler_aggregate_by_all_categories(
@@ -131,7 +158,7 @@ def test_handler_aggregate_by_all_categories(
 
     body = json.loads(response["body"])
     response_items = body["items"]
-    response_items_categories = set([item["category"] for item in response_items])
+    response_items_categories = {item["category"] for item in response_items}
     category_total_price = {
         "Beauty": 60.00,
         "Electrics": 10.00,
@@ -139,7 +166,7 @@ def test_handler_aggregate_by_all_categories(
     }
 
     # Verify item was correctly filtered
-    assert response_items_categories == set(["Beauty", "Electrics", "Music"])
+    assert response_items_categories == {"Beauty", "Electrics", "Music"}
     assert (
         all(
             [
@@ -169,6 +196,24 @@ def test_handler_aggregate_by_one_category(
     assert len(response_items) == 1
     assert response_items[0]["category"] == "Music"
     assert response_items[0]["total_price"] == 100.0
+    assert response["headers"]["Cache-Control"] in (
+        "public, max-age=29",
+        "public, max-age=30",
+    )
+
+
+def test_handler_max_age_is_remaining_cache_ttl(environment_variable):
+    # The Music aggregate was cached 20.5 seconds ago, 9.5 seconds of its TTL are left
+    aggregateInventoryFunction._CACHE["Music"] = (
+        time.monotonic() - 20.5,
+        {"category": "Music", "total_price": 10.0, "count": 1},
+    )
+    event = {"queryStringParameters": {"category": "Music"}}
+
+    response = handler(event, None)
+
+    assert json.loads(response["body"])["items"][0]["total_price"] == 10.0
+    assert response["headers"]["Cache-Control"] == "public, max-age=9"
 
 
 def test_handler_invalid_category_parameter():
@@ -192,17 +237,42 @@ def test_handler_missing_category_parameter():
 
 
 @patch.dict(os.environ, {"CATEGORIES": '["Electronics", "Books"]'})
-def test_valid_categories(target_items, other_items):
+def test_category_lookup(target_items, other_items):
     """
-    Test that the function returns the expected list when CATEGORIES env var is set.
+    Test that lowercased category inputs map to the categories stored in the table.
     """
-    expected_categories = (
-        ["Electronics", "Books"]
-        + ["electronics", "books"]
-        + ["All", "ALL", "AlL", "ALl", "alL", "aLl", "all"]
+    expected_lookup = {"electronics": "Electronics", "books": "Books"}
+    actual_lookup = get_category_lookup()
+    assert actual_lookup == expected_lookup
+
+
+def test_handler_category_is_case_insensitive(
+    environment_variable, target_items, other_items
+):
+    for category in ["music", "MUSIC", "mUsIc"]:
+        event = {"queryStringParameters": {"category": category}}
+
+        response = handler(event, None)
+
+        response_items = json.loads(response["body"])["items"]
+        assert len(response_items) == 1
+        assert response_items[0]["category"] == "Music"
+        assert response_items[0]["total_price"] == 100.0
+
+    event = {"queryStringParameters": {"category": "ALL"}}
+    response = handler(event, None)
+    response_items = json.loads(response["body"])["items"]
+    assert set(item["category"] for item in response_items) == set(
+        ["Beauty", "Electrics", "Music"]
     )
-    actual_categories = get_valid_categories()
-    assert actual_categories, expected_categories
+
+
+@patch.dict(os.environ, {"CATEGORIES": '["Electronics", "Books"]'})
+def test_canonical_categories():
+    """
+    Test that only the categories as stored in the table are used for aggregation.
+    """
+    assert get_canonical_categories() == ["Electronics", "Books"]
 
 
 def test_handler_empty_category(environment_variable, target_items, other_items):
@@ -241,3 +311,77 @@ def test_handler_missing_category_parameter():
     assert response["statusCode"] == 400
     body = json.loads(response["body"])
     assert body["error"] == "Missing or invalid category"
+
+
+@patch("lambdas.aggregateInventoryFunction.dynamodb_client")
+def test_get_inventory_of_category_reads_all_pages(mock_client):
+    mock_client.query.side_effect = [
+        {
+            "Items": [{"price": {"N": "10"}}, {"price": {"N": "20"}}],
+            "Count": 2,
+            "LastEvaluatedKey": {"name": {"S": "b"}, "category": {"S": "Music"}},
+        },
+        {"Items": [{"price": {"N": "30"}}], "Count": 1},
+    ]
+
+    result = get_inventory_of_category("TestTable", "Music", "CategoryPriceIndex")
+
+    assert result == {"category": "Music", "total_price": 60.0, "count": 3}
+    assert mock_client.query.call_count == 2
+    assert mock_client.query.call_args.kwargs["ExclusiveStartKey"] == {
+        "name": {"S": "b"},
+        "category": {"S": "Music"},
+    }
+    assert mock_client.query.call_args.kwargs["ProjectionExpression"] == "price"
+
+
+@patch("lambdas.aggregateInventoryFunction.time.monotonic")
+@patch("lambdas.aggregateInventoryFunction.get_inventory_of_category")
+def test_cached_inventory_of_category_expires(mock_get_inventory, mock_monotonic):
+    mock_get_inventory.side_effect = [
+        {"category": "Music", "total_price": 10.0, "count": 1},
+        {"category": "Music", "total_price": 30.0, "count": 2},
+    ]
+
+    # Second call is within the TTL and served from memory, third call is after the TTL
+    mock_monotonic.return_value = 100.0
+    first = get_cached_inventory_of_category("TestTable", "Music", "CategoryPriceIndex")
+    mock_monotonic.return_value = 129.0
+    second = get_cached_inventory_of_category(
+        "TestTable", "Music", "CategoryPriceIndex"
+    )
+    mock_monotonic.return_value = 131.0
+    third = get_cached_inventory_of_category("TestTable", "Music", "CategoryPriceIndex")
+
+    assert first == second == {"category": "Music", "total_price": 10.0, "count": 1}
+    assert third["total_price"] == 30.0
+    assert mock_get_inventory.call_count == 2
+
+
+@patch("lambdas.aggregateInventoryFunction.dynamodb_client")
+def test_get_inventory_of_all_categories_scans_once(mock_client):
+    segment_items = {
+        0: [
+            {"category": {"S": "Music"}, "price": {"N": "10"}},
+            {"category": {"S": "Beauty"}, "price": {"N": "5"}},
+        ],
+        1: [{"category": {"S": "Music"}, "price": {"N": "20"}}],
+    }
+    mock_client.scan.side_effect = lambda **params: {
+        "Items": segment_items.get(params["Segment"], [])
+    }
+
+    result = aggregateInventoryFunction.get_inventory_of_all_categories(
+        "TestTable", "CategoryPriceIndex"
+    )
+    # Served from the in-memory cache
+    aggregateInventoryFunction.get_inventory_of_all_categories(
+        "TestTable", "CategoryPriceIndex"
+    )
+
+    assert {item["category"]: item["total_price"] for item in result} == {
+        "Music": 30.0,
+        "Beauty": 5.0,
+    }
+    assert mock_client.scan.call_count == aggregateInventoryFunction.SCAN_SEGMENTS
+    mock_client.query.assert_not_called()
@@ -1,20 +1,21 @@
+import json
 import pytest
 import aws_cdk as cdk
-from aws_cdk.assertions import Template
+from aws_cdk.assertions import Match, Template
 from inventory_management_system.api_lambda_stack import ApiLambdaStack
 
 from inventory_management_system.dynamodb_stack import (
     DynamoDbStack,
 )
 from inventory_management_system.data_model.dynamodb_data_model import (
+    CategoryEnum,
     DynamoDbTableModel,
     global_secondary_indexes,
     create_db_attribute,
 )
 
 
-@pytest.fixture
-def api_lambda_stack():
+def create_api_lambda_stack(**kwargs):
     app = cdk.App()
 
     table_model = DynamoDbTableModel(
@@ -31,15 +32,23 @@ def api_lambda_stack():
 
     # Create the ApiLambdaStack
     api_lambda_stack = ApiLambdaStack(
-        app, "ApiLambdaTestStack", dynamodb_table=dynamodb_stack.inventory_table
+        app,
+        "ApiLambdaTestStack",
+        dynamodb_table=dynamodb_stack.inventory_table,
+        **kwargs,
     )
 
     return api_lambda_stack
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def api_lambda_stack():
+    return create_api_lambda_stack()
+
+
+@pytest.fixture(scope="module")
 def template(api_lambda_stack):
-    # synthesized template
+    # synthesized template, shared by the tests of this module as none of them modify it
     return Template.from_stack(api_lambda_stack)
 
 
@@ -90,6 +99,42 @@ def test_lambda_functions_created(template):
     )
 
 
+def test_aggregate_function_categories_environment(template):
+    # Assert that CATEGORIES is passed to aggregateInventoryFunction as a JSON array
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "aggregateInventoryFunction.handler",
+            "Environment": {
+                "Variables": {"CATEGORIES": json.dumps(CategoryEnum.list())}
+            },
+        },
+    )
+
+
+def test_lambda_functions_have_separate_assets(template):
+    # Assert that every function is deployed from its own asset
+    functions = template.find_resources("AWS::Lambda::Function")
+    asset_keys = [
+        function["Properties"]["Code"]["S3Key"]
+        for function in functions.values()
+        if "Handler" in function["Properties"]
+        and function["Properties"]["Handler"].endswith("Function.handler")
+    ]
+    assert len(asset_keys) == 5
+    assert len(set(asset_keys)) == 5
+
+
+def test_common_layer_attached_to_functions(template):
+    # Assert that the shared layer is created once and attached to every function
+    template.resource_count_is("AWS::Lambda::LayerVersion", 1)
+    layer_id = list(template.find_resources("AWS::Lambda::LayerVersion"))[0]
+    functions = template.find_resources(
+        "AWS::Lambda::Function", {"Properties": {"Layers": [{"Ref": layer_id}]}}
+    )
+    assert len(functions) == 5
+
+
 def test_api_created(template):
     # Assert that API created
     template.has_resource_properties(
@@ -120,3 +165,73 @@ def test_api_created(template):
         "AWS::ApiGatewayV2::Route",
         {"RouteKey": "POST /inventories"},
     )
+
+
+def test_api_cache_distribution_created(template):
+    # Assert that aggregate responses are cached by category query parameter
+    template.has_resource_properties(
+        "AWS::CloudFront::CachePolicy",
+        {
+            "CachePolicyConfig": {
+                "DefaultTTL": 30,
+                "MinTTL": 0,
+                "ParametersInCacheKeyAndForwardedToOrigin": {
+                    "QueryStringsConfig": {
+                        "QueryStringBehavior": "whitelist",
+                        "QueryStrings": ["category"],
+                    },
+                },
+            },
+        },
+    )
+
+    # Assert that the aggregate route is served through the cache policy
+    template.has_resource_properties(
+        "AWS::CloudFront::Distribution",
+        {
+            "DistributionConfig": {
+                "CacheBehaviors": [
+                    {
+                        "PathPattern": "/inventories/aggregate*",
+                        # Managed SimpleCORS policy, allowing all origins
+                        "ResponseHeadersPolicyId": "60669652-455b-4ae9-85a4-c4c02393f86c",
+                    }
+                ],
+            },
+        },
+    )
+
+
+def test_api_cache_domain_name_exported(template):
+    # Assert that the distribution domain is output, so clients can call the API through the cache
+    template.has_output(
+        "InventoryApiCacheDomainName",
+        {
+            "Value": {
+                "Fn::GetAtt": [
+                    Match.string_like_regexp("InventoryApiDistribution"),
+                    "DomainName",
+                ]
+            }
+        },
+    )
+
+
+def test_no_provisioned_concurrency_by_default(template):
+    template.resource_count_is("AWS::Lambda::Alias", 0)
+
+
+def test_provisioned_concurrency_for_read_and_upsert_functions():
+    template = Template.from_stack(
+        create_api_lambda_stack(provisioned_concurrency=True)
+    )
+
+    # Assert that only the three read functions and the upsert function get a provisioned alias
+    template.resource_count_is("AWS::Lambda::Alias", 4)
+    template.has_resource_properties(
+        "AWS::Lambda::Alias",
+        {
+            "Name": "live",
+            "ProvisionedConcurrencyConfig": {"ProvisionedConcurrentExecutions": 1},
+        },
+    )
@@ -0,0 +1,216 @@
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import common
+from common import (
+    BOTO_CONFIG,
+    InvalidPriceError,
+    build_missing_fields_responses,
+    dumps,
+    ensure_index_ready,
+    get_wait_timeout,
+    json_response,
+    loads,
+    prime_client,
+    to_price,
+)
+
+
+@patch("common.time.sleep")
+def test_ensure_index_ready_only_checks_once(mock_sleep, monkeypatch):
+    monkeypatch.setattr(common, "_READY_INDEXES", set())
+    mock_client = MagicMock()
+    mock_client.describe_table.side_effect = [
+        {
+            "Table": {
+                "GlobalSecondaryIndexes": [
+                    {"IndexName": "CategoryPriceIndex", "IndexStatus": "CREATING"}
+                ]
+            }
+        },
+        {
+            "Table": {
+                "GlobalSecondaryIndexes": [
+                    {"IndexName": "CategoryPriceIndex", "IndexStatus": "ACTIVE"}
+                ]
+            }
+        },
+    ]
+
+    ensure_index_ready(mock_client, "TestTable", "CategoryPriceIndex")
+    ensure_index_ready(mock_client, "TestTable", "CategoryPriceIndex")
+
+    # Index was polled until ACTIVE on the first call, and skipped on the second call
+    assert mock_client.describe_table.call_count == 2
+    mock_sleep.assert_called_once_with(0.5)
+
+
+@patch("common.time.monotonic")
+@patch("common.time.sleep")
+def test_ensure_index_ready_times_out(mock_sleep, mock_monotonic, monkeypatch):
+    monkeypatch.setattr(common, "_READY_INDEXES", set())
+    mock_client = MagicMock()
+    mock_client.describe_table.return_value = {
+        "Table": {
+            "GlobalSecondaryIndexes": [
+                {"IndexName": "CategoryPriceIndex", "IndexStatus": "CREATING"}
+            ]
+        }
+    }
+    # Deadline is 60 seconds after the first call, the index is still CREATING after 61 seconds
+    mock_monotonic.side_effect = [0, 10, 61]
+
+    with pytest.raises(RuntimeError):
+        ensure_index_ready(mock_client, "TestTable", "CategoryPriceIndex")
+
+    assert mock_sleep.call_args_list == [((0.5,),)]
+    assert ("TestTable", "CategoryPriceIndex") not in common._READY_INDEXES
+
+
+@patch("common.time.monotonic")
+@patch("common.time.sleep")
+def test_ensure_index_ready_never_sleeps_past_timeout(
+    mock_sleep, mock_monotonic, monkeypatch
+):
+    monkeypatch.setattr(common, "_READY_INDEXES", set())
+    mock_client = MagicMock()
+    mock_client.describe_table.return_value = {
+        "Table": {
+            "GlobalSecondaryIndexes": [
+                {"IndexName": "CategoryPriceIndex", "IndexStatus": "CREATING"}
+            ]
+        }
+    }
+    # Deadline is 0.7 seconds after the first call, only 0.1 second is left before the second sleep
+    mock_monotonic.side_effect = [0, 0.1, 0.6, 0.8]
+
+    with pytest.raises(RuntimeError):
+        ensure_index_ready(mock_client, "TestTable", "CategoryPriceIndex", timeout=0.7)
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == pytest.approx(
+        [0.5, 0.1]
+    )
+
+
+def test_get_wait_timeout():
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 3000
+
+    # The default Lambda timeout of 3 seconds leaves 2 seconds to wait
+    assert get_wait_timeout(context) == 2.0
+    context.get_remaining_time_in_millis.return_value = 500
+    assert get_wait_timeout(context) == 0.0
+    # Handlers called without a context (eg: in tests) use the default
+    assert get_wait_timeout(None) == 60
+
+
+def test_boto_config_fails_fast():
+    # A stuck request is given up after a few seconds instead of the botocore default of 60
+    assert BOTO_CONFIG.connect_timeout == 1
+    assert BOTO_CONFIG.read_timeout == 2
+    assert BOTO_CONFIG.retries["mode"] == "adaptive"
+
+
+def test_json_response():
+    response = json_response({"error": "Not found"}, 404)
+
+    assert response["statusCode"] == 404
+    assert response["headers"] == {"Content-Type": "application/json"}
+    assert json.loads(response["body"]) == {"error": "Not found"}
+
+
+def test_json_response_with_headers():
+    response = json_response({"items": []}, headers={"Cache-Control": "no-cache"})
+
+    # API Gateway only unwraps the body of responses with a status code
+    assert response["statusCode"] == 200
+    assert response["headers"] == {
+        "Content-Type": "application/json",
+        "Cache-Control": "no-cache",
+    }
+    assert json.loads(response["body"]) == {"items": []}
+
+
+def test_dumps_decimal():
+    assert json.loads(dumps({"price": Decimal("10.5"), "count": 2})) == {
+        "price": 10.5,
+        "count": 2,
+    }
+
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(common, "orjson", None)
+
+    assert json.loads(dumps([{"price": Decimal("1")}])) == [{"price": 1.0}]
+
+
+def test_loads():
+    assert loads('{"name": "item", "price": 1.5}') == {"name": "item", "price": 1.5}
+
+
+def test_build_missing_fields_responses():
+    responses = build_missing_fields_responses(("name", "category", "price"))
+
+    # One response for every non-empty combination of missing fields
+    assert len(responses) == 7
+    response = responses[frozenset({"price", "name"})]
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {
+        "error": "Missing required field(s): name, price"
+    }
+
+
+def test_prime_client_only_in_provisioned_concurrency(monkeypatch):
+    mock_client = MagicMock()
+
+    monkeypatch.delenv("AWS_LAMBDA_INITIALIZATION_TYPE", raising=False)
+    prime_client(mock_client)
+    mock_client.describe_endpoints.assert_not_called()
+
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", "provisioned-concurrency")
+    mock_client.describe_endpoints.side_effect = Exception("Network error")
+    # Errors are not raised, the first request opens the connection instead
+    prime_client(mock_client)
+    mock_client.describe_endpoints.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (10, "10"),
+        (10.5, "10.5"),
+        (1e-05, "1e-05"),
+        ("123.4567890123", "123.4567890123"),
+        (
+            "9.9999999999999999999999999999999999999E+125",
+            "9.9999999999999999999999999999999999999E+125",
+        ),
+        ("1e-130", "1e-130"),
+    ],
+)
+def test_to_price(value, expected):
+    assert to_price(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "-1",
+        "abc",
+        "10\n",
+        "",
+        True,
+        None,
+        float("nan"),
+        "١٢٣",
+        "1e999999",
+        "1e126",
+        "1e-131",
+        "1" * 39,
+    ],
+)
+def test_to_price_invalid(value):
+    with pytest.raises(InvalidPriceError):
+        to_price(value)
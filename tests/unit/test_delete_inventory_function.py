@@ -6,6 +6,9 @@ import boto3
 from unittest.mock import patch
 from botocore.exceptions import ClientError
 
+# The lambda reads its configuration once at import time
+os.environ["DB_TABLE_NAME"] = "TestTable"
+
 from lambdas.deleteInventoryFunction import handler
 
 
@@ -50,9 +53,9 @@ def test_successful_deletion(dynamodb_mock):
     assert "Laptop of Electrics category was deleted successfully" in response["body"]
 
 
-@patch("lambdas.deleteInventoryFunction.dynamodb.Table")
+@patch("lambdas.deleteInventoryFunction.TABLE")
 def test_client_error(mock_table):
-    mock_table().delete_item.side_effect = ClientError(
+    mock_table.delete_item.side_effect = ClientError(
         {
             "Error": {
                 "Code": "ConditionalCheckFailedException",
@@ -68,9 +71,9 @@ def test_client_error(mock_table):
     assert "The conditional request failed" in response["body"]
 
 
-@patch("lambdas.deleteInventoryFunction.dynamodb.Table")
+@patch("lambdas.deleteInventoryFunction.TABLE")
 def test_client_error(mock_table):
-    mock_table().delete_item.side_effect = Exception("Something went wrong")
+    mock_table.delete_item.side_effect = Exception("Something went wrong")
     event = {"body": json.dumps({"name": "Laptop", "category": "Electronics"})}
     response = handler(event, None)
 
@@ -46,7 +46,9 @@ def test_extended_enum_list_method():
         OPTION1 = "Option 1"
         OPTION2 = "Option 2"
 
-    assert ExampleEnum.list() == ["Option 1", "Option 2"]
+    assert ExampleEnum.list() == ("Option 1", "Option 2")
+    # Result is cached on the class
+    assert ExampleEnum.list() is ExampleEnum.list()
 
 
 def test_category_enum_str_representation():
@@ -54,7 +56,7 @@ def test_category_enum_str_representation():
 
 
 def test_category_enum_list_method():
-    assert CategoryEnum.list() == [
+    assert CategoryEnum.list() == (
         "Music",
         "Grocery",
         "Clothing",
@@ -63,7 +65,7 @@ def test_category_enum_list_method():
         "Outdoors",
         "Electrics",
         "Beauty",
-    ]
+    )
 
 
 def test_create_db_attribute():
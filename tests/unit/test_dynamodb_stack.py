@@ -11,7 +11,7 @@ from inventory_management_system.data_model.dynamodb_data_model import (
 )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def dynamodb_stack():
     app = cdk.App()
 
@@ -31,9 +31,9 @@ def dynamodb_stack():
     return dynamodb_stack
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def template(dynamodb_stack):
-    # synthesized template
+    # synthesized template, shared by the tests of this module as none of them modify it
     return Template.from_stack(dynamodb_stack)
 
 
@@ -101,3 +101,17 @@ def test_dynamodb_global_secondary_indexes(template):
             ]
         },
     )
+
+
+def test_dynamodb_table_populated(dynamodb_stack, template):
+    # Assert that a single full batch of fake items is written on creation
+    template.resource_count_is("Custom::AWS", 1)
+    assert len(dynamodb_stack.generate_batch_fake_data()) == 25
+
+
+def test_first_batch_keeps_original_resource_id(dynamodb_stack, template):
+    # Renaming the first batch would make deployed stacks create it again and write 25 more items
+    assert dynamodb_stack.node.try_find_child("initializeTableResource") is not None
+    assert list(template.find_resources("Custom::AWS")) == [
+        "initializeTableResourceED64F4F6"
+    ]
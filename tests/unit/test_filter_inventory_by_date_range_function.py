@@ -6,15 +6,19 @@ import pytest
 from moto import mock_aws
 import boto3
 
+# The lambda reads its configuration once at import time
+os.environ["DB_TABLE_NAME"] = "TestTable"
+
 from lambdas.filterInventoryByDateRangeFunction import handler
 
 
-@pytest.fixture
-def dynamodb_mock():
+@pytest.fixture(scope="module")
+def dynamodb_table():
+    # The table is created once for all the tests of this module, see dynamodb_mock
     with mock_aws():
         dynamodb = boto3.resource("dynamodb")
         table_name = "TestTable"
-        dynamodb.create_table(
+        table = dynamodb.create_table(
             TableName=table_name,
             KeySchema=[
                 {"AttributeName": "name", "KeyType": "HASH"},
@@ -43,52 +47,61 @@ def dynamodb_mock():
             ],
         )
         os.environ["DB_TABLE_NAME"] = table_name
-        yield table_name
+        yield table
+
+
+@pytest.fixture
+def dynamodb_mock(dynamodb_table):
+    yield dynamodb_table
+    # Empty the table so every test starts from the same state
+    with dynamodb_table.batch_writer() as batch:
+        for item in dynamodb_table.scan()["Items"]:
+            batch.delete_item(Key={"name": item["name"], "category": item["category"]})
 
 
 def test_handler_filter_within_range(dynamodb_mock):
     # Pre-insert an item into the table(last_updated_dt = 1 feb, 2 feb, 3 march, 4 march)
-    table = boto3.resource("dynamodb").Table(dynamodb_mock)
-    table.put_item(
-        Item={
-            "name": "feb_one_product",
-            "category": "feb_one_category",
-            "price": Decimal("100.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-02-01T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
-    table.put_item(
-        Item={
-            "name": "target_product_1",
-            "category": "target_category",
-            "price": Decimal("90.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-02-02T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
-    table.put_item(
-        Item={
-            "name": "target_product_2",
-            "category": "target_category",
-            "price": Decimal("10.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-03-03T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
-    table.put_item(
-        Item={
-            "name": "march_four_product",
-            "category": "march_four_category",
-            "price": Decimal("10.00"),
-            "static_pk": "PRODUCT",
-            "last_updated_dt": "2023-03-04T00:00:00.000055",
-            "id": str(uuid.uuid4()),
-        }
-    )
+    with dynamodb_mock.batch_writer() as batch:
+        batch.put_item(
+            Item={
+                "name": "feb_one_product",
+                "category": "feb_one_category",
+                "price": Decimal("100.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-02-01T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
+        batch.put_item(
+            Item={
+                "name": "target_product_1",
+                "category": "target_category",
+                "price": Decimal("90.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-02-02T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
+        batch.put_item(
+            Item={
+                "name": "target_product_2",
+                "category": "target_category",
+                "price": Decimal("10.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-03-03T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
+        batch.put_item(
+            Item={
+                "name": "march_four_product",
+                "category": "march_four_category",
+                "price": Decimal("10.00"),
+                "static_pk": "PRODUCT",
+                "last_updated_dt": "2023-03-04T00:00:00.000055",
+                "id": str(uuid.uuid4()),
+            }
+        )
 
     event = {
         "queryStringParameters": {
@@ -99,7 +112,10 @@ def test_handler_filter_within_range(dynamodb_mock):
 
     response = handler(event, None)
 
-    body = response["body"]
+    # API Gateway sends the JSON body as is to the client
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"] == "application/json"
+    body = json.loads(response["body"])
     response_items = body["items"]
     filtered_items_names = [item["name"] for item in response_items]
 
@@ -1,16 +1,28 @@
-import os, json
+import os, json, base64
 from decimal import Decimal
 import pytest
 from moto import mock_aws
 import boto3
+from unittest.mock import patch
+from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 
-from lambdas.queryInventoryFunction import handler
+# The lambda reads its configuration once at import time
+os.environ["DB_TABLE_NAME"] = "test-table"
+
+from lambdas.queryInventoryFunction import (
+    build_dynamodb_query_params,
+    encode_cursor,
+    handler,
+)
 from inventory_management_system.data_model.dynamodb_data_model import CategoryEnum
 
+CATEGORIES = CategoryEnum.list()
+
 
-@pytest.fixture
-def dynamodb_mock():
+@pytest.fixture(scope="module")
+def dynamodb_table():
+    # The table is created once for all the tests of this module, see mocked_items
     with mock_aws():
         table_name = "test-table"
         os.environ["DB_TABLE_NAME"] = table_name
@@ -74,8 +86,8 @@ def dynamodb_mock():
         yield table
 
 
-@pytest.fixture
-def mocked_items(dynamodb_mock):
+@pytest.fixture(scope="module")
+def mocked_items(dynamodb_table):
     """Mock test data
 
     Generates mock data for items in all categories.
@@ -89,232 +101,232 @@ def mocked_items(dynamodb_mock):
     The last_udpated_dt of items within a category is set such that 'item 2' is the latest one,
     and 'item 3' will be the oldest.
 
+    The items are written once and shared by the tests of this module, as none of them modify the table.
+
     Args:
-        dynamodb_mock (moto.MockDynamoDB): A mocked DynamoDB table
+        dynamodb_table (moto.MockDynamoDB): A mocked DynamoDB table
     """
     items = []
-    categories = CategoryEnum.list()
-    for category in categories:
+    # Single anchor so the 'item 2' of every category has the same latest last_updated_dt
+    now = datetime.now()
+    # items with i=2 is the latest, the one with i=3 will be the oldest
+    last_updated_dt_isos = {
+        1: (now - timedelta(days=1)).isoformat(),
+        2: now.isoformat(),
+        3: (now - timedelta(days=3)).isoformat(),
+    }
+    for category in CATEGORIES:
         for i in range(1, 4):
-            now = datetime.now()
-            last_udpated_dt = now - timedelta(days=i)
-            last_udpated_dt_iso = last_udpated_dt.isoformat()
-
             items.append(
                 {
                     "name": f"item {i}",
                     "category": category,
                     "id": f"{category}-item-id-{i}",
-                    "price": Decimal(
-                        str(30 - i * 5)
-                    ),  # item with smaller id has higher price
+                    # item with smaller id has higher price
+                    "price": Decimal(30 - i * 5),
                     "static_pk": "PRODUCT",
-                    "last_updated_dt": (
-                        now.isoformat() if i == 2 else last_udpated_dt_iso
-                    ),  # items with i=2 is the latest, the one with i=3 will be the oldest
+                    "last_updated_dt": last_updated_dt_isos[i],
                 }
             )
 
-    with mock_aws():
+    with dynamodb_table.batch_writer() as batch:
         for item in items:
-            dynamodb_mock.put_item(Item=item)
-        yield dynamodb_mock
-
-
-# ----- Test: filter by one parameter only  ----- #
-def test_handler_by_category_only(mocked_items):
+            batch.put_item(Item=item)
+    yield dynamodb_table
+
+
+# ----- Test: filter by one or a combination of filter parameters  ----- #
+@pytest.mark.parametrize(
+    "filters,expected_count",
+    [
+        # 3 items were created for every category
+        pytest.param({"category": "Music"}, 3, id="category"),
+        # An item named 'item 1' was created for every category
+        pytest.param({"name": "item 1"}, len(CATEGORIES), id="name"),
+        # Only 'item 3'(price 15) of every category is in the range
+        pytest.param({"price_range": [1, 19]}, len(CATEGORIES), id="price_range"),
+        pytest.param({"name": "item 1", "category": "Music"}, 1, id="name-category"),
+        # Every item is in the range, but only 'item 1' of every category has the name
+        pytest.param(
+            {"name": "item 1", "price_range": [1, 30]},
+            len(CATEGORIES),
+            id="name-price_range",
+        ),
+        # Only 'item 3' of 'Clothing' is in the range
+        pytest.param(
+            {"category": "Clothing", "price_range": [1, 19]},
+            1,
+            id="category-price_range",
+        ),
+        # The combination of name and category(primary key of our dynamodb table) is unique
+        pytest.param(
+            {"name": "item 1", "category": "Clothing", "price_range": [1, 30]},
+            1,
+            id="name-category-price_range",
+        ),
+    ],
+)
+def test_query_by_filters(mocked_items, filters, expected_count):
     """
-    Note: As we created 3 items for every category during mocking,
-    returned item count should be 3
+    Note: Within a category, the price of 'item 1' is 25, 'item 2' is 20 and 'item 3' is 15
+    (see documentation of 'mocked_items' fixtures for more details).
+    Every returned item should match all the given filters.
     """
-    target_category = "Music"
-    query_params = {"filters": {"category": target_category}, "pagination": {"page": 1}}
+    query_params = {"filters": filters, "pagination": {"page": 1}}
     event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    response = json.loads(handler(event, None)["body"])
 
     returned_items = response["items"]
-    returned_items_categories = set([item["category"] for item in returned_items])
-    assert len(returned_items) == 3
-    assert returned_items_categories == {target_category}
+    assert len(returned_items) == expected_count
+    if "name" in filters:
+        assert all(item["name"] == filters["name"] for item in returned_items)
+    if "category" in filters:
+        assert all(item["category"] == filters["category"] for item in returned_items)
+    if "price_range" in filters:
+        lower_bound, upper_bound = filters["price_range"]
+        assert all(
+            lower_bound <= item["price"] <= upper_bound for item in returned_items
+        )
 
 
-def test_query_by_name_only(mocked_items):
+@pytest.mark.parametrize(
+    "filters,expected_count",
+    [
+        pytest.param({"category": "Music"}, 3, id="category"),
+        pytest.param({"name": "item 1"}, len(CATEGORIES), id="name"),
+        pytest.param({}, len(CATEGORIES) * 3, id="no-filters"),
+    ],
+)
+def test_query_count_only(mocked_items, filters, expected_count):
     """
-    Note: As we created an item named 'item 1' for every category during mocking,
-    returned item count should be the same with the num of category
+    Note: the count covers every matching item, regardless of the pagination limit
     """
-    target_name = "item 1"
-    query_params = {"filters": {"name": target_name}, "pagination": {"page": 1}}
+    query_params = {"filters": filters, "pagination": {"limit": 1}, "select": "COUNT"}
     event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
-
-    returned_items = response["items"]
+    response = json.loads(handler(event, None)["body"])
 
-    num_of_item_named_item1 = len(CategoryEnum.list())
-    returned_items_names = set([item["name"] for item in returned_items])
-    assert len(returned_items) == num_of_item_named_item1
-    assert returned_items_names == {target_name}
+    assert response == {"count": expected_count}
 
 
-def test_query_by_price_range_only(mocked_items):
+# ----- Test: filter by combination of 3 filter parameters pagination  ----- #
+def test_query_by_pagination_limit(mocked_items):
     """
-    Note: As we created items within a category such that price of 'item 1' is 25,
-    'item 2' is 20 and 'item 3' is 15(see documentation of 'mocked_items' fixtures for more details),
-    returned item of price_range: [1, 19] should be 'item 3' from each category
+    Note: since combination of name and category(primary key of our dynamodb table) is unique,
+    we should only get 1 item returned.
     """
     lower_bound = 1
-    upper_bound = 19
-    query_params = {
-        "filters": {"price_range": [lower_bound, upper_bound]},
-        "pagination": {"page": 1},
-    }
-    event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
-
-    returned_items = response["items"]
-
-    num_of_item_within_price_range = len(CategoryEnum.list())
-    assert len(returned_items) == num_of_item_within_price_range
-    assert (
-        all(
-            lower_bound <= element["price"] <= upper_bound for element in returned_items
-        )
-        == True
-    )
-
-
-# ----- Test: filter by combination of 2 filter parameters  ----- #
-def test_query_by_name_category(mocked_items):
+    upper_bound = 30
+    target_category = "Clothing"
     query_params = {
         "filters": {
-            "name": "item 1",
-            "category": "Music",
+            "category": target_category,
+            "price_range": [lower_bound, upper_bound],
         },
-        "pagination": {"page": 1},
+        "pagination": {"page": 2, "limit": 1},
     }
     event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    response = json.loads(handler(event, None)["body"])
 
-    returned_item = response["items"]
-
-    assert len(returned_item) == 1
-    assert returned_item[0]["category"] == "Music"
+    returned_items = response["items"]
+    assert len(returned_items) == 1
+    assert response["page"] == 2
+    assert response["cursor"] is not None
 
 
-def test_query_by_name_in_price_range(mocked_items):
+def test_query_pagination_with_cursor(mocked_items):
     """
-    Note: As we created items within a category such that price of 'item 1' is 25,
-    'item 2' is 20 and 'item 3' is 15(see documentation of 'mocked_items' fixtures for more details),
-    returned item of price_range: [1, 30] should be all items from every category,
-    but since we filter by name='item 1', we should get only 'item 1' from each category
+    Note: 'item 1', 'item 2' and 'item 3' of 'Clothing' are returned in descending order of price,
+    so following the cursor from page 1 with one item per page should return them in that order
     """
-    lower_bound = 1
-    upper_bound = 30
     query_params = {
-        "filters": {"name": "item 1", "price_range": [1, 30]},
-        "pagination": {"page": 1},
+        "filters": {"category": "Clothing"},
+        "sort": {"field": "price", "order": "desc"},
+        "pagination": {"page": 1, "limit": 1},
     }
-    event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    response = json.loads(handler({"body": json.dumps(query_params)}, None)["body"])
+    returned_item_names = [item["name"] for item in response["items"]]
 
-    returned_items = response["items"]
+    while response["cursor"]:
+        query_params["pagination"] = {"cursor": response["cursor"], "limit": 1}
+        response = json.loads(handler({"body": json.dumps(query_params)}, None)["body"])
+        assert "page" not in response
+        returned_item_names.extend(item["name"] for item in response["items"])
 
-    num_of_item1_within_price_range = len(CategoryEnum.list())
-    assert len(returned_items) == num_of_item1_within_price_range
-    assert (
-        all(
-            lower_bound <= element["price"] <= upper_bound for element in returned_items
-        )
-        == True
-    )
+    assert returned_item_names == ["item 1", "item 2", "item 3"]
 
 
-def test_query_by_category_in_price_range(mocked_items):
+def test_query_pagination_with_null_cursor(mocked_items):
     """
-    Note: As we created items within a category such that price of 'item 1' is 25,
-    'item 2' is 20 and 'item 3' is 15(see documentation of 'mocked_items' fixtures for more details),
-    returned item of price_range: [1, 19] should be all items from every category,
-    but since we filter by category='Clothing', we should get only 'item 1' from 'Clothing' category
+    Note: the last page returns a null cursor, sending it back returns the first page
     """
-    lower_bound = 1
-    upper_bound = 19
-    target_category = "Clothing"
     query_params = {
-        "filters": {
-            "category": target_category,
-            "price_range": [lower_bound, upper_bound],
-        },
-        "pagination": {"page": 1},
+        "filters": {"category": "Clothing"},
+        "sort": {"field": "price", "order": "desc"},
+        "pagination": {"cursor": None, "limit": 1},
     }
-    event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
-
-    returned_items = response["items"]
-
-    num_of_clothing_item_within_price_range = 1
-    returned_items_categories = set([item["category"] for item in returned_items])
-    assert len(returned_items) == num_of_clothing_item_within_price_range
-    assert returned_items_categories == {target_category}
-    assert (
-        all(
-            lower_bound <= element["price"] <= upper_bound for element in returned_items
-        )
-        == True
-    )
-
-
-# ----- Test: filter by combination of 3 filter parameters  ----- #
-def test_query_by_name_category_in_price_range(mocked_items):
-    """
-    Note: since combination of name and category(primary key of our dynamodb table) is unique,
-    we should only get 1 item returned.
-    """
-    lower_bound = 1
-    upper_bound = 30
-    target_category = "Clothing"
+    response = handler({"body": json.dumps(query_params)}, None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert [item["name"] for item in body["items"]] == ["item 1"]
+    assert body["cursor"] is not None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(b'["name"]').decode(),
+        base64.urlsafe_b64encode(b'{"unknown": {"S": "key"}}').decode(),
+    ],
+)
+def test_query_pagination_with_invalid_cursor(mocked_items, cursor):
     query_params = {
-        "filters": {
-            "name": "item 1",
-            "category": target_category,
-            "price_range": [lower_bound, upper_bound],
-        },
-        "pagination": {"page": 1},
+        "filters": {"category": "Clothing"},
+        "pagination": {"cursor": cursor, "limit": 1},
     }
-    event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
-
-    returned_items = response["items"]
-    assert len(returned_items) == 1
-    assert (
-        all(
-            lower_bound <= element["price"] <= upper_bound for element in returned_items
-        )
-        == True
-    )
-
-
-# ----- Test: filter by combination of 3 filter parameters pagination  ----- #
-def test_query_by_pagination_limit(mocked_items):
+    response = handler({"body": json.dumps(query_params)}, None)
+
+    # A malformed or tampered cursor is a client error
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["error"] == f"Invalid cursor: {cursor}"
+
+
+@pytest.mark.parametrize(
+    "message, status_code",
+    [
+        (
+            "The provided starting key is invalid: The provided key element does not match the schema",
+            400,
+        ),
+        ("Exclusive Start Key must have same size as table's key schema", 400),
+        ("The provided ExclusiveStartKey is invalid", 400),
+        ("The provided start key is invalid", 400),
+        (
+            "One or more parameter values were invalid: Condition parameter type does not match schema type",
+            500,
+        ),
+    ],
+)
+def test_query_pagination_cursor_validation_errors(mocked_items, message, status_code):
     """
-    Note: since combination of name and category(primary key of our dynamodb table) is unique,
-    we should only get 1 item returned.
+    Only the validation errors about the start key are reported as an invalid cursor
     """
-    lower_bound = 1
-    upper_bound = 30
-    target_category = "Clothing"
+    cursor = encode_cursor({"name": {"S": "item 1"}, "category": {"S": "Clothing"}})
     query_params = {
-        "filters": {
-            "category": target_category,
-            "price_range": [lower_bound, upper_bound],
-        },
-        "pagination": {"page": 2, "limit": 1},
+        "filters": {"category": "Clothing"},
+        "pagination": {"cursor": cursor, "limit": 1},
     }
-    event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    error = ClientError(
+        {"Error": {"Code": "ValidationException", "Message": message}}, "Query"
+    )
+    with patch(
+        "lambdas.queryInventoryFunction.dynamodb_client.query", side_effect=error
+    ):
+        response = handler({"body": json.dumps(query_params)}, None)
 
-    returned_items = response["items"]
-    assert len(returned_items) == 1
-    assert response["page"] == 2
+    assert response["statusCode"] == status_code
 
 
 # ----- Test: sorting  ----- #
@@ -329,7 +341,7 @@ def test_sort_query(mocked_items):
         "sort": {"field": "price", "order": "desc"},
     }
     event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    response = json.loads(handler(event, None)["body"])
 
     item_name_sorted_by_last_updated_dt = ["item 1", "item 2", "item 3"]
     returned_item_name_list = [item["name"] for item in response]
@@ -346,7 +358,7 @@ def test_sort_by_last_updated_dt_asc_by_default(mocked_items):
         "filters": {"category": "Clothing"},
     }
     event = {"body": json.dumps(query_params)}
-    response = handler(event, None)
+    response = json.loads(handler(event, None)["body"])
 
     item_name_sorted_by_last_updated_dt = ["item 3", "item 2", "item 1"]
     returned_item_name_list = [item["name"] for item in response]
@@ -363,8 +375,8 @@ def test_query_with_no_filters(mocked_items):
             }
         )
     }
-    response = handler(event, None)
-    assert len(response["items"]) == len(CategoryEnum.list()) * 3
+    response = json.loads(handler(event, None)["body"])
+    assert len(response["items"]) == len(CATEGORIES) * 3
 
 
 def test_return_in_list_if_no_pagination(mocked_items):
@@ -379,4 +391,86 @@ def test_return_in_list_if_no_pagination(mocked_items):
         )
     }
     response = handler(event, None)
-    assert len(response) == len(CategoryEnum.list()) * 3
+
+    # API Gateway sends the JSON body as is to the client, which receives the list of items
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"] == "application/json"
+    items = json.loads(response["body"])
+    assert isinstance(items, list)
+    assert len(items) == len(CATEGORIES) * 3
+
+
+def test_build_query_params_uses_low_level_expressions():
+    params = build_dynamodb_query_params(
+        "test-table", {"category": "Music", "price_range": [1, 19]}, {}, {}
+    )
+
+    assert params["IndexName"] == "CategoryPriceIndex"
+    assert (
+        params["KeyConditionExpression"]
+        == "category = :category AND price BETWEEN :min_price AND :max_price"
+    )
+    assert params["ExpressionAttributeValues"] == {
+        ":category": {"S": "Music"},
+        ":min_price": {"N": "1"},
+        ":max_price": {"N": "19"},
+    }
+
+
+def test_query_pagination_skips_previous_pages(mocked_items):
+    """
+    Note: 'item 1', 'item 2' and 'item 3' of 'Clothing' are returned in descending order of price,
+    so with one item per page, page 2 should be 'item 2' and page 4 should be empty
+    """
+    pages = {}
+    for page in [1, 2, 4]:
+        query_params = {
+            "filters": {"category": "Clothing"},
+            "sort": {"field": "price", "order": "desc"},
+            "pagination": {"page": page, "limit": 1},
+        }
+        pages[page] = json.loads(
+            handler({"body": json.dumps(query_params)}, None)["body"]
+        )
+
+    assert [item["name"] for item in pages[1]["items"]] == ["item 1"]
+    assert [item["name"] for item in pages[2]["items"]] == ["item 2"]
+    assert pages[4]["items"] == []
+    assert pages[4]["page"] == 4
+
+
+def test_build_query_params_with_zero_min_price():
+    # A price range starting from 0 still uses the price index instead of returning all items
+    params = build_dynamodb_query_params(
+        "test-table", {"price_range": [0, 100]}, {}, {}
+    )
+
+    assert params["IndexName"] == "ItemsPriceIndex"
+    assert params["ExpressionAttributeValues"][":min_price"] == {"N": "0"}
+
+
+@pytest.mark.parametrize(
+    "price_range",
+    [["abc", 10], [1, "10\n"], [-1, 10], ["١٢٣", 10], [1, "1e999999"]],
+)
+def test_query_with_invalid_price_range(price_range):
+    query_params = {"filters": {"price_range": price_range}}
+    event = {"body": json.dumps(query_params)}
+    response = handler(event, None)
+
+    # An invalid price is a client error
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["error"].startswith("Invalid price: ")
+
+
+def test_query_accepts_prices_stored_by_upsert(mocked_items):
+    # Prices in exponent notation can be stored by the upsert function, so they are valid bounds too
+    query_params = {
+        "filters": {"price_range": ["1e1", "1.9e1"]},
+        "pagination": {"page": 1},
+    }
+    event = {"body": json.dumps(query_params)}
+    response = json.loads(handler(event, None)["body"])
+
+    # Only 'item 3'(price 15) of every category is in the range
+    assert len(response["items"]) == len(CATEGORIES)
@@ -1,4 +1,6 @@
 import os
+import sys
+import subprocess
 import json
 import uuid
 from decimal import Decimal
@@ -6,17 +8,22 @@ from unittest.mock import patch
 import pytest
 from moto import mock_aws
 import boto3
+from botocore.exceptions import ReadTimeoutError
 from datetime import datetime
 
+# The lambda reads its configuration once at import time
+os.environ["DB_TABLE_NAME"] = "TestTable"
+
 from lambdas.upsertInventoryFunction import handler
 
 
-@pytest.fixture
-def dynamodb_mock():
+@pytest.fixture(scope="module")
+def dynamodb_table():
+    # The table is created once for all the tests of this module, see dynamodb_mock
     with mock_aws():
         dynamodb = boto3.resource("dynamodb")
         table_name = "TestTable"
-        dynamodb.create_table(
+        table = dynamodb.create_table(
             TableName=table_name,
             KeySchema=[
                 {"AttributeName": "name", "KeyType": "HASH"},
@@ -29,87 +36,181 @@ def dynamodb_mock():
             ProvisionedThroughput={"ReadCapacityUnits": 1, "WriteCapacityUnits": 1},
         )
         os.environ["DB_TABLE_NAME"] = table_name
-        yield table_name
+        yield table
 
 
-def test_handler_create_item(dynamodb_mock):
-    test_uuid = str(uuid.uuid4())
-    test_datetime = "2024-01-01T00:00:00.000055"
+@pytest.fixture
+def dynamodb_mock(dynamodb_table):
+    yield dynamodb_table
+    # Empty the table so every test starts from the same state
+    with dynamodb_table.batch_writer() as batch:
+        for item in dynamodb_table.scan()["Items"]:
+            batch.delete_item(Key={"name": item["name"], "category": item["category"]})
 
-    with patch("uuid.uuid4", return_value=test_uuid), patch(
-        "lambdas.upsertInventoryFunction.datetime"
-    ) as mock_datetime:
-        mock_datetime.now.return_value = datetime.fromisoformat(test_datetime)
 
-        event = {
-            "body": json.dumps(
-                {"name": "new_item", "category": "test_category", "price": 123.5}
-            )
-        }
+@pytest.fixture
+def no_dynamodb_calls():
+    # Requests with missing fields must be rejected before DynamoDB is called
+    with patch(
+        "lambdas.upsertInventoryFunction.dynamodb_client.update_item",
+        side_effect=AssertionError("DynamoDB must not be called"),
+    ) as mock_update_item:
+        yield
+    mock_update_item.assert_not_called()
 
-        response = handler(event, None)
+
+TEST_UUID = str(uuid.uuid4())
+TEST_DATETIME = "2024-01-01T00:00:00.000055"
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.fromisoformat(TEST_DATETIME)
+
+
+@pytest.fixture
+def frozen_uuid_and_datetime(monkeypatch):
+    # New items get TEST_UUID as id and every write is stamped with TEST_DATETIME
+    monkeypatch.setattr("uuid.uuid4", lambda: TEST_UUID)
+    monkeypatch.setattr("lambdas.upsertInventoryFunction.datetime", FrozenDatetime)
+
+
+def test_handler_create_item(dynamodb_mock, frozen_uuid_and_datetime):
+    event = {
+        "body": json.dumps(
+            {"name": "new_item", "category": "test_category", "price": 123.5}
+        )
+    }
+
+    response = handler(event, None)
 
     body = json.loads(response["body"])
-    assert body["id"] == test_uuid
+    assert body["id"] == TEST_UUID
 
     # # Verify item was correctly created in DynamoDB
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(dynamodb_mock)
-    result = table.get_item(Key={"name": "new_item", "category": "test_category"})
+    result = dynamodb_mock.get_item(
+        Key={"name": "new_item", "category": "test_category"}
+    )
     item = result.get("Item")
     assert item is not None
     assert item["price"] == Decimal("123.5")
     assert item["static_pk"] == "PRODUCT"
-    assert item["last_updated_dt"] == test_datetime
-    assert item["id"] == test_uuid
+    assert item["last_updated_dt"] == TEST_DATETIME
+    assert item["id"] == TEST_UUID
+
 
+def test_handler_update_item(dynamodb_mock, frozen_uuid_and_datetime):
+    existing_uuid = str(uuid.UUID(int=1))
+
+    # Pre-insert an item into the table(price=100.00)
+    dynamodb_mock.put_item(
+        Item={
+            "name": "test_product",
+            "category": "test_category",
+            "price": Decimal("100.00"),
+            "static_pk": "PRODUCT",
+            "last_updated_dt": "2023-01-01T00:00:00.000055",
+            "id": existing_uuid,
+        }
+    )
+
+    event = {
+        "body": json.dumps(
+            {"name": "test_product", "category": "test_category", "price": 123.7}
+        )
+    }
+
+    response = handler(event, None)
 
-def test_handler_update_item(dynamodb_mock):
+    # The id of the existing item is kept
+    body = json.loads(response["body"])
+    assert body["id"] == existing_uuid
+
+    # Verify item was correctly updated in DynamoDB
+    result = dynamodb_mock.get_item(
+        Key={"name": "test_product", "category": "test_category"}
+    )
+    item = result.get("Item")
+    assert item is not None
+    assert item["price"] == Decimal("123.7")
+    assert item["static_pk"] == "PRODUCT"
+    assert item["last_updated_dt"] == TEST_DATETIME
+    assert item["id"] == existing_uuid
+
+
+def test_handler_same_price_skips_update(dynamodb_mock):
     test_uuid = str(uuid.uuid4())
-    test_datetime = "2024-01-01T00:00:00.000055"
 
-    with patch("uuid.uuid4", return_value=test_uuid), patch(
-        "lambdas.upsertInventoryFunction.datetime"
-    ) as mock_datetime:
-        mock_datetime.now.return_value = datetime.fromisoformat(test_datetime)
+    # Pre-insert an item into the table(price=100.00)
+    dynamodb_mock.put_item(
+        Item={
+            "name": "test_product",
+            "category": "test_category",
+            "price": Decimal("100.00"),
+            "static_pk": "PRODUCT",
+            "last_updated_dt": "2023-01-01T00:00:00.000055",
+            "id": test_uuid,
+        }
+    )
 
-        # Pre-insert an item into the table(price=100.00)
-        table = boto3.resource("dynamodb").Table(dynamodb_mock)
-        table.put_item(
-            Item={
+    event = {
+        "body": json.dumps(
+            {"name": "test_product", "category": "test_category", "price": 100}
+        )
+    }
+
+    response = handler(event, None)
+
+    # The existing id is returned
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert body["id"] == test_uuid
+
+    # Verify the item was not written again
+    result = dynamodb_mock.get_item(
+        Key={"name": "test_product", "category": "test_category"}
+    )
+    assert result["Item"]["last_updated_dt"] == "2023-01-01T00:00:00.000055"
+
+
+def test_handler_high_precision_price(dynamodb_mock):
+    # Prices sent as strings are stored as is
+    event = {
+        "body": json.dumps(
+            {
                 "name": "test_product",
                 "category": "test_category",
-                "price": Decimal("100.00"),
-                "static_pk": "PRODUCT",
-                "last_updated_dt": "2023-01-01T00:00:00.000055",
-                "id": test_uuid,
+                "price": "123.45678901234567890123",
             }
         )
+    }
 
-        event = {
-            "body": json.dumps(
-                {"name": "test_product", "category": "test_category", "price": 123.7}
-            )
-        }
+    handler(event, None)
 
-        response = handler(event, None)
+    result = dynamodb_mock.get_item(
+        Key={"name": "test_product", "category": "test_category"}
+    )
+    assert result["Item"]["price"] == Decimal("123.45678901234567890123")
 
-        body = json.loads(response["body"])
-        assert body["id"] == test_uuid
 
-        # Verify item was correctly updated in DynamoDB
-        result = table.get_item(
-            Key={"name": "test_product", "category": "test_category"}
+@pytest.mark.parametrize("price", ["-1", "abc", "10\n", True, "١٢٣", "1e999999"])
+def test_handler_invalid_price(no_dynamodb_calls, price):
+    event = {
+        "body": json.dumps(
+            {"name": "test_product", "category": "test_category", "price": price}
         )
-        item = result.get("Item")
-        assert item is not None
-        assert item["price"] == Decimal("123.7")
-        assert item["static_pk"] == "PRODUCT"
-        assert item["last_updated_dt"] == test_datetime
-        assert item["id"] == test_uuid
+    }
+
+    response = handler(event, None)
 
+    # An invalid price is a client error, nothing is written
+    assert response["statusCode"] == 400
+    body = json.loads(response["body"])
+    assert body["error"] == f"Invalid price: {price}"
 
-def test_handler_missing_name_parameter():
+
+def test_handler_missing_name_parameter(no_dynamodb_calls):
     event = {"body": json.dumps({"category": "test_category", "price": 123.45})}
 
     response = handler(event, None)
@@ -119,7 +220,7 @@ def test_handler_missing_name_parameter():
     assert body["error"] == "Missing required field(s): name"
 
 
-def test_handler_missing_category_parameter():
+def test_handler_missing_category_parameter(no_dynamodb_calls):
     event = {"body": json.dumps({"name": "test_product", "price": 123.45})}
 
     response = handler(event, None)
@@ -129,7 +230,7 @@ def test_handler_missing_category_parameter():
     assert body["error"] == "Missing required field(s): category"
 
 
-def test_handler_missing_price_parameter():
+def test_handler_missing_price_parameter(no_dynamodb_calls):
     event = {"body": json.dumps({"name": "test_product", "category": "test_category"})}
 
     response = handler(event, None)
@@ -137,3 +238,57 @@ def test_handler_missing_price_parameter():
     assert response["statusCode"] == 400
     body = json.loads(response["body"])
     assert body["error"] == "Missing required field(s): price"
+
+
+def test_handler_missing_multiple_parameters(no_dynamodb_calls):
+    event = {"body": json.dumps({"name": "test_product"})}
+
+    response = handler(event, None)
+
+    assert response["statusCode"] == 400
+    body = json.loads(response["body"])
+    assert body["error"] == "Missing required field(s): category, price"
+
+
+def test_handler_read_timeout():
+    event = {
+        "body": json.dumps(
+            {"name": "test_product", "category": "test_category", "price": 100}
+        )
+    }
+
+    with patch(
+        "lambdas.upsertInventoryFunction.dynamodb_client.update_item",
+        side_effect=ReadTimeoutError(endpoint_url="https://dynamodb"),
+    ):
+        response = handler(event, None)
+
+    # The timeout is reported as an error instead of keeping the function running
+    assert response["statusCode"] == 500
+    body = json.loads(response["body"])
+    assert "Read timeout" in body["error"]
+
+
+def test_handler_module_imports_no_cdk():
+    """
+    The function is deployed without the CDK app, importing it must not pull aws_cdk or the stacks.
+    """
+    lambdas_dir = os.path.join(os.path.dirname(__file__), "..", "..", "lambdas")
+    code = (
+        "import sys, upsertInventoryFunction; "
+        "heavy = [m for m in sys.modules if m.startswith(('aws_cdk', 'inventory_management_system'))]; "
+        "assert not heavy, heavy"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=lambdas_dir,
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(sys.path),
+            "DB_TABLE_NAME": "TestTable",
+        },
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr